@@ -1,4 +1,4 @@
-# b3s23osc.py version 1.1.7
+# b3s23osc.py version 1.2
 # version 1.0: David Raucci, 1/5/2021 ( https://conwaylife.com/forums/viewtopic.php?p=118160#p118160 )
 # version 1.1: Dave Greene,  1/5/2021 ( handle various possible error conditions, copy result to clipboard )
 # version 1.1.1: David Raucci, 1/6/2021 ( add last two periods, remove delay for testing patterns )
@@ -8,172 +8,104 @@
 # version 1.1.5: David Raucci, 7/21/2021 ( fix missing objects )
 # version 1.1.6: Dave Greene, 7/22/2021 ( add LifeViewer labels )
 # version 1.1.7: Dave Greene, 11/24/2021 ( remove deprecated LABELTARGET, use LABELVIEWDIST instead )
+# version 1.2: 10/18/2026 ( runs headless without Golly and in any outer-totalistic rule (--rule); pass 2 is batched,
+#   cached and run on a process pool; the build is split into checkpointed parse/analyze/layout/emit stages
+#   (--from/--to) with the layout in osclayout.py; the collection is streamed to its file, and a SQLite catalog
+#   and a binary store (oscillators.sqlite, oscillators.bin) are written alongside it )
 
 import time
-import golly as g
 import os
+import argparse
+import io
+import json
+try:
+    import golly as g
+    HEADLESS = False
+except ImportError: # not running inside Golly; use the built-in engine instead
+    import lifeengine as g
+    HEADLESS = True
 from datetime import date
+from liferule import rule_name
+from osclib import Canvas, analyze_entry, analyze_entries, analyze_batch, make_oscillator, make_glyph, placeholder
+from osclayout import layout, digit_rles, block, labellookup
+from stampcache import stamp
+from osccache import load_cache, save_cache, cache_lookup, cache_store
+from oscreader import read_records, write_index
+from oscstore import write_store
+from osccatalog import write_catalog
+from oscwriter import save_collection, write_collection
+from oscprofile import write_report, summary
+from osccheckpoint import (save_checkpoint, load_checkpoint, records_to_json, records_from_json,
+                           oscillators_to_json, oscillators_from_json, columns_to_json, columns_from_json)
 
 ROW_WIDTH = 150
-COL_HEIGHT = 1300  # note: if a single period is taller than height variable, it won't work properly
+COL_HEIGHT = 1300
+RULE = "B3/S23" # entries of oscillators.txt in any other rule are skipped; a sibling collection can use another outer-totalistic rule
 SLOW_MSG = False
-
-# These are the zoom levels set for labels on objects with different widths
-# E.g., for objects of width 1 to width 5, the zoom level is set to 50
-# (because for small objects there's not a lot of room for a label)
-labellookup = [20]*5 + [15]*5 + [14]*5 + [13]*5 + [12]*5 + [11]*5 + [10]*5 + [9]*5 + [8]*5 + [7]*5 + [6]*5 + [5]*1000  # last number just allows for increases to ROW_WIDTH
+WORKERS = (os.cpu_count() or 1) if HEADLESS else 1 # processes for pass 2; Golly can't start worker processes
+COMPACT_PHASE = False # show each oscillator in its phase with the smallest bounding box instead of the phase in oscillators.txt
+BATCH = True # simulate small oscillators together on one board (needs NumPy)
+CACHE_FILE = os.path.join(g.getdir("data"), "b3s23osc-cache.json") # set to None to re-run every pattern
+INDEX_FILE = os.path.join(g.getdir("data"), "oscillators-index.json") # offsets of each entry by name and period; None to skip
+STORE_FILE = os.path.join(g.getdir("data"), "oscillators.bin") # binary copy of every oscillator for other tools (see oscstore.py); None to skip
+CATALOG_FILE = os.path.join(g.getdir("data"), "oscillators.sqlite") # searchable list of the oscillators (see osccatalog.py); None to skip
+PROFILE_FILE = None # e.g. "b3s23osc-profile.csv" (or .json) to report how long each pattern took
+TIMINGS_FILE = os.environ.get("B3S23OSC_TIMINGS") # if set, seconds spent in each stage are saved here as JSON (used by benchmark.py)
+SOURCE_FILE = os.path.join(g.getdir("data"), "oscillators.txt") # the list of oscillators to build from
+OUTPUT_FILE = "oscillators.rle" # where a headless build saves the stamp collection; end it in .gz to compress
+CHECKPOINT_DIR = os.path.join(g.getdir("data"), "b3s23osc-build") # what each stage leaves for the next (see osccheckpoint.py); None to skip
 
 today = date.today().strftime("%b %d, %Y")
 
 start_time = time.time()
-g.setrule("B3/S23")
-# clear the universe before starting to build stamp collection
-g.new("/Users/davidraucci/Conway's Game of Life/oscillators.rle")
+stage_times = {} #stage name -> seconds
+stage_start = start_time
+
+def stage_done(name):
+    global stage_start
+    now = time.time()
+    stage_times[name] = now - stage_start
+    stage_start = now
 
 def show_message(message, time_):
     g.show(str(message))
     if SLOW_MSG: time.sleep(time_)
 
-def convert_rle_to_grid(rle):
-    comments = ''
-    rle = rle.replace('rule = b3/s23', 'rule = B3/S23')
-    if 'rule = B3/S23' in rle:
-        comments = rle[:rle.index('x =')]
-        rle = rle[rle.index('rule = B3/S23')+13:] #starts after the dimension and rule identifiers
-    else:
-        show_message('"rule = B3/S23 not in RLE": ' + rle,0.5)
-        return {}
-    pattern = {}
-    rle_decoded = g.parse(rle)
-    for i in range(len(rle_decoded)):
-        if i % 2:
-            continue
-        pattern[(rle_decoded[i],rle_decoded[i+1])] = 1
-    max_x = max(rle_decoded[::2])
-    max_y = max(rle_decoded[1::2])
-    for i in range(max_x+1):
-        for j in range(max_y+1):
-            pattern[(i,j)] = pattern.get((i,j), 0)
-    return (pattern, comments)
-
-def run_pattern_in_golly(pattern, comments, extended):
-    if extended:
-        try:
-            extended = int(pattern[pattern.index('%')+1:])
-        except ValueError: #sometimes there's a % sign in the comments
-            extended = False
-    pattern_rle = pattern
-    pattern = g.parse(pattern)
-    if len(pattern) % 2 == 1: #multistate rule for some reason
-        g.warn(pattern_rle)
-        g.warn(str(pattern))
-    initial_pattern = pattern.copy()
-    xs = pattern[::2]
-    ys = pattern[1::2]
-    min_x = 0
-    max_x = max(xs)
-    min_y = 0
-    max_y = max(ys)
-    min_min_x = min_x #these four are the permanent minima and maxima, used for determining maximum pattern size
-    max_max_x = max_x
-    min_min_y = min_y
-    max_max_y = max_y
-    for period in range(1, 1000): #maximum oscillator period
-        if period == 999 and extended:
-            pattern = g.evolve(pattern, extended - 999)
-        pattern = g.evolve(pattern,1)
-        if not pattern:
-            g.warn('Not an oscillator, dies out completely: %s' % initial_pattern)
-            return
-        xs = pattern[::2]
-        ys = pattern[1::2]
-        min_min_x = min(min_min_x, min(xs)) #sets new absolute minima and maxima
-        max_max_x = max(max_max_x, max(xs))
-        min_min_y = min(min_min_y, min(ys))
-        max_max_y = max(max_max_y, max(ys))
-        if pattern == initial_pattern:
-            if extended:
-                return (comments + convert_grid_to_rle(pattern), extended, max_max_x-min_min_x+1, max_max_y-min_min_y+1, -min_min_x, -min_min_y)
-            else:
-                return (comments + convert_grid_to_rle(pattern), period, max_max_x-min_min_x+1, max_max_y-min_min_y+1, -min_min_x, -min_min_y)
-            #0: RLE. 1: period. 2, 3: maximum bounding box for x and y. 4, 5: Greatest negative for calculating offset.
-        #if extended == 'file': #one at a time
-        #    return pattern
-    g.warn('Not an oscillator, maximum generations reached: %s' % initial_pattern)
-    return
-
-#these create the digits for labeling periods
-zero = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$o5bo$bo5bo$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
-one = 'x = 8, y = 14, rule = B3/S23 6b2o$7bo$6bo$6b2o2$6b2o$7bo$6bo$6b2o2$6b2o$7bo$6bo$6b2o!'
-two = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o$2o$o$bo$2o$2b2obo$2bob2o!'
-three = 'x = 8, y = 14, rule = B3/S232b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o!'
-four = 'x = 8, y = 14, rule = B3/S23\n2o4b2o$bo5bo$o5bo$2o4b2o$2bob2o$2b2obo$6b2o$7bo$6bo$6b2o3$6b2o$6b2o!'
-five = 'x = 8, y = 14, rule = B3/S23\n2bob2o$2b2obo$2o$bo$o$2o$2bob2o$2b2obo$6b2o$7bo$6bo$6b2o$2bob2o$2b2obo!'
-six = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o$o$bo$2o$2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
-seven = 'x = 8, y = 14, rule = B3/S232bob2o$2b2obo$6b2o$7bo$6bo$6b2o$4b2o$5bo$4bo$4b2o$2b2o$3bo$2bo$2b2o!'
-eight = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
-nine = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o!'
-block = 'x = 2, y = 2, rule = B3/S23\n2o$2o!'
-
-num_dict = {'0':'zero','1':'one','2':'two','3':'three','4':'four','5':'five','6':'six','7':'seven','8':'eight','9':'nine'}
-
-digit_rles = [zero,one,two,three,four,five,six,seven,eight,nine]
-
-def spacing(period): #both for horizontal and vertical spacing
-    if period == 1:
-        return 3
-    elif period in (2, 3):
-        return 4
-    elif 4 <= period <= 9:
-        return 5
-    else:
-        return 7
-
-def digit_width(num):
-    num = str(num)
-    return 10*len(num) - 6*(num[0] == '1')
+#decoded once here and reused for every placement
+digit_glyphs = [make_glyph(i,1,14,8) for i in digit_rles]
+block_glyph = make_glyph(block,1,2,2)
 
-def create_column(pattern_dict, width_change):
-    global grid, comments, lvcomments
-    current_period = min(pattern_dict[i][1] for i in pattern_dict)
+def create_column(pattern_dict, width_change, grid, placements):
+    # pastes the column into the grid, lists its objects for the catalog and
+    # returns its #N/#C comments and its labels as (x, y, size, text)
+    column_comments = ''
+    labels = []
+    current_period = min(pattern_dict[i].period for i in pattern_dict)
     period_row = 0
-    pattern_dict_copy = pattern_dict.copy()
-    for i in pattern_dict_copy:
-        if i[1] >= period_y:
-            del pattern_dict[i]
-    max_y = max(i[1]+pattern_dict[i][3] for i in pattern_dict)
     rows = max(i[3] for i in pattern_dict)
-    while max(i[1]+pattern_dict[i][3]+rows for i in pattern_dict) <= COL_HEIGHT:
-        if max(i[1] for i in pattern_dict) < 30:
-            break #prevent infinite loop on single line
-        pattern_dict_copy = {}
-        for i in pattern_dict:
-            pattern_dict_copy[(i[0], i[1]+i[3], i[2], i[3])] = pattern_dict[i] #spaces out patterns vertically
-        pattern_dict = pattern_dict_copy.copy()
-    for x1 in range(-digit_width(period) + column_x + width_change, ROW_WIDTH + column_x + width_change): #negative numbers used for creating the digits
-        for y1 in range(0, COL_HEIGHT-1):
-            grid[(x1,y1)] = 0 #fill everything with off cells
     for i in pattern_dict:
-        if i[3] == rows and pattern_dict[i][0] == block:
+        osc = pattern_dict[i]
+        if i[3] == rows and osc is block_glyph:
             continue
-        grid_form = convert_rle_to_grid(pattern_dict[i][0])
-        if pattern_dict[i][1] > current_period:
-            comments += '#C ----------------------------------------------------------------------\n'
-            current_period = pattern_dict[i][1]
+        if osc.period > current_period:
+            column_comments += '#C ----------------------------------------------------------------------\n'
+            current_period = osc.period
             period_row = i[3]
         current_comment = ''
         if i[2] >= 0: #not a digit
-            current_comment = grid_form[1]
+            current_comment = osc.comments
             if '#N' not in current_comment:
                 current_comment = '#N\n' + current_comment
-            comments += '#N %s.%s.%s ' % (pattern_dict[i][1], i[3]-period_row, i[2]) + current_comment[3:]
-        grid_form = grid_form[0]
+            column_comments += '#N %s.%s.%s ' % (osc.period, i[3]-period_row, i[2]) + current_comment[3:]
         deltax, deltay = i[0]+width_change, i[1]
-        minx = min(j[0]+deltax for j in grid_form)
-        maxx = max(j[0]+deltax for j in grid_form)
-        miny = min(j[1]+deltay for j in grid_form)
-        maxy = max(j[1]+deltay for j in grid_form)
+        box = stamp(osc)
+        if i[2] >= 0:
+            placements.append(('%s.%s.%s' % (osc.period, i[3]-period_row, i[2]), osc, deltax, deltay))
         if not current_comment == '':
+            minx = deltax #every RLE's bounding box starts at (0,0)
+            maxx = box.right+deltax
+            miny = deltay
+            maxy = box.bottom+deltay
             lvlabel = current_comment[3:]
             lvlabel = lvlabel[:(lvlabel+"#C").find("#C")].strip().replace('"',"'")  # don't include #C comments in labels, they're usually too long
             if lvlabel.find("\n#O ")>-1:
@@ -182,199 +114,117 @@ def create_column(pattern_dict, width_change):
             if lvlabel.find("#O ")>-1:
               lvlabel = lvlabel.replace('#O ','[')+"]"
               lvlabel = lvlabel.replace('[]','')
-            lvcomments += '#C [[ '
             # the 4 is a fudge factor -- all labels were showing up 4 cells too far to the left
-            lbl = str(labellookup[maxx-minx])
-            lvcomments += 'LABEL ' + str((minx+maxx)//2 + 4) + ' ' + str((miny+maxy)//2) + ' ' + lbl + ' "' + lvlabel + '" ]]\n'        
-        for j in grid_form:
-            if grid_form.get(j, 0) == 1:
-                grid[(j[0]+deltax, j[1]+deltay)] = 1 #paste patterns in
+            labels.append(((minx+maxx)//2 + 4, (miny+maxy)//2, labellookup[maxx-minx], lvlabel))
+        grid.paste(box.cells, deltax, deltay) #paste patterns in
+    return column_comments, labels
 
-def convert_grid_to_rle(grid1):
-    if type(grid1) == list:
-        grid = {}
-        for i in range(0,len(grid1),2):
-            grid[(grid1[i],grid1[i+1])] = 1
-    else:
-        grid = grid1
-    min_x = min(cell[0] for cell in grid)
-    max_x = max(cell[0] for cell in grid)
-    min_y = min(cell[1] for cell in grid)
-    max_y = max(cell[1] for cell in grid)
-    for i in range(min_x,max_x+1):
-        for j in range(min_y,max_y+1):
-             grid[(i,j)] = grid.get((i,j),0)
-    to_return = 'x = %s, y = %s, rule = B3/S23\n' % (max_x-min_x+1, max_y-min_y+1) #\n is newline
-    for j in range(min_y,max_y+1):
-        while to_return[-1] == 'b': #remove blanks at the end of a line
-            to_return = to_return[:-1]
-        to_return += '$'
-        for i in range(min_x,max_x+1):
-            to_return += ('o' if grid.get((i,j),0) == 1 else 'b')
-    while to_return[-1] == 'b': #remove blanks at the end of the last line
-         to_return = to_return[:-1]
-    while to_return[-1] == '$': #remove empty lines at the end
-         to_return = to_return[:-1]
-    to_return += '!'
-    while '\n$' in to_return:
-        to_return = to_return.replace('\n$', '\n')
-    for i in ('b','o','$'):
-        for j in ('b','o','$','\n'):
-            if j != i:
-                to_return = to_return.replace(j+i+i, j+'2'+i) #bb becomes 2b, but bbbbbbb becomes 2bbbbb, not 2b2b2b
-        num = 2
-        while (str(num) + i + i) in to_return:
-            to_return = to_return.replace(str(num) + i + i,str(num+1) + i) #2bbbb becomes 3bbbb, 3bbbb becomes 4bb, etc.
-            num += 1
-    while 'B3/S23 ' in to_return:
-        to_return = to_return.replace('B3/S23 $','B3/S23 ') #remove newlines at the beginning
-    return to_return
+def label_line(x, y, size, text):
+    return '#C [[ LABEL ' + str(x) + ' ' + str(y) + ' ' + str(size) + ' "' + text + '" ]]\n'
 
 def open_file2(file):
+    # returns the file actually read and its entries
     if not os.path.exists(file):
         oldfile = file
-        file = g.opendialog("Please locate " + file + ":", "Text files (*.txt)|*.txt", "", file)     
+        file = g.opendialog("Please locate " + file + ":", "Text files (*.txt)|*.txt", "", file) # headless, this only looks in the usual folders
         if not os.path.exists(file):
             g.exit("Could not find '" + oldfile + "' or '" + file + "'.")
-    f = open(file, 'r')
-    f1 = f.read()
-    f1 = f1.replace('b3/s23', 'B3/S23')
-    while '\n\n\n' in f1:
-        f1 = f1.replace('\n\n\n', '\n\n')
-    f1 = f1.split('\n\n')
-    #f1 = f1[:-2] #last two are larger than column width and will cause infinite loop
-    for i in f1:
-        #try:
-        #    i = i[i.index('x ='):]
-        #except ValueError:
-        #    print('No "x =": ' + i)
-        patterns.append(i)
-        show_message("Pass 1 of 3: processing pattern #" + str(len(patterns)),0.001)
-    show_message('Total number of patterns: %s' % len(patterns),0.5)
+    records = []
+    for record in read_records(file):
+        records.append(record)
+        show_message("Pass 1 of 3: processing pattern #" + str(len(records)),0.001)
+    show_message('Total number of patterns: %s' % len(records),0.5)
+    return file, records
+
+STAGES = ['parse', 'analyze', 'layout', 'emit']
+counts = {} #patterns and columns, for the timings file
 
-patterns = []
-open_file2("/Users/davidraucci/Conway's Game of Life/oscillators.txt")
-data = [(0,1234567,0,0,0,0)] #this period 1234567 marks the end of the file
-count = 0
-for i in patterns:
-    count += 1
-    show_message('Pass 2 of 3: %s of %s done, %s seconds ' % (count-1, len(patterns), int(time.time() - start_time)),0)
-    try:
-        data.append(run_pattern_in_golly(i[i.index('= B3/S23')+9:], i[:i.index('x =')], '%' in i)) #max period 1000 without %, 100000 with %
-    except ValueError:
-        g.warn('"= B3/S23" not found: ' + i)
-show_message('All done, ' + str(int(time.time() - start_time)) + ' seconds',0.5)
+def parse_stage(source):
+    # pass 1: returns the file actually read and its entries
+    source, records = open_file2(source)
+    counts['patterns'] = len(records)
+    stage_done('parse')
+    return source, records
 
-while None in data: #non-oscillators:
-    data.remove(None)
-#for i in num_dict.values(): #digits from other files
-#    if eval(i) in data:
-#        data.remove(eval(i))
-num_patterns = len(data)
+def analyze_stage(source, records):
+    # Pass 2: runs every entry (or takes it from the cache) and returns the
+    # oscillators sorted by period, then height, and the profile rows (None
+    # unless PROFILE_FILE is set).
+    patterns = [r.text for r in records]
+    data = [placeholder('End of file',1234567,0)] #this period 1234567 marks the end of the file
+    cache = load_cache(CACHE_FILE, COMPACT_PHASE) if CACHE_FILE else None
+    results = [cache_lookup(cache, i) if cache else None for i in patterns]
+    todo = [n for n in range(len(patterns)) if results[n] is None] #only these need to be run
+    show_message('%s of %s patterns found in cache' % (len(patterns)-len(todo), len(patterns)),0.5)
+    remaining = todo
+    profile = [{'entry': n+1, 'name': records[n].name, 'source': 'cache'} for n in range(len(patterns))] if PROFILE_FILE else None
+    if BATCH and todo:
+        show_message('Pass 2 of 3: running %s patterns in batches' % len(todo),0)
+        for n, result in zip(todo, analyze_batch([patterns[n] for n in todo], profile and [profile[n] for n in todo], COMPACT_PHASE, RULE)):
+            results[n] = result
+        remaining = [n for n in todo if results[n] is None] #these are run one at a time
+    if WORKERS > 1:
+        warnings = []
+        for n, (result, messages, stats) in zip(remaining, analyze_entries([patterns[n] for n in remaining], WORKERS,
+                lambda done: show_message('Pass 2 of 3: %s of %s done, %s seconds ' % (done, len(remaining), int(time.time() - start_time)),0), bool(profile), COMPACT_PHASE, RULE)):
+            results[n] = result
+            if profile:
+                profile[n].update(stats)
+            warnings.extend('Pattern #%s: %s' % (n+1, m) for m in messages)
+        if warnings: #one report at the end instead of a popup per problem
+            g.warn('\n\n'.join(warnings))
+    else:
+        count = 0
+        for n in remaining:
+            count += 1
+            show_message('Pass 2 of 3: %s of %s done, %s seconds ' % (count-1, len(remaining), int(time.time() - start_time)),0)
+            results[n] = analyze_entry(patterns[n], g.warn, profile and profile[n], COMPACT_PHASE, RULE)
+    if cache is not None:
+        for n in todo:
+            cache_store(cache, patterns[n], results[n])
+        save_cache(CACHE_FILE, cache)
+    if INDEX_FILE:
+        write_index(INDEX_FILE, source, records, [i and i[1] for i in results])
+    data.extend(make_oscillator(results[n], profile and profile[n], RULE) if results[n] else None for n in range(len(results)))
+    first_with_hash = {}
+    duplicates = []
+    for n in range(len(results)):
+        if results[n]:
+            if results[n][6] in first_with_hash: #another phase, rotation or reflection of an earlier entry
+                m = first_with_hash[results[n][6]]
+                duplicates.append('#%s %s is the same as #%s %s' % (n+1, records[n].name or '(no name)', m+1, records[m].name or '(no name)'))
+            else:
+                first_with_hash[results[n][6]] = n
+    if duplicates:
+        hashlife_only = sum(1 for n in range(len(results)) if results[n] and '%' in patterns[n][patterns[n].find('x ='):])
+        g.warn('Possible duplicates:\n' + '\n'.join(duplicates) +
+               ('\n(%s entries with %%N are only compared in their stored phase)' % hashlife_only if hashlife_only else ''))
+    if profile:
+        for n in range(len(results)):
+            profile[n]['ok'] = results[n] is not None
+        write_report(PROFILE_FILE, profile)
+    show_message('All done, ' + str(int(time.time() - start_time)) + ' seconds',0.5)
 
-data.sort(key=lambda a:(a[1],a[3])) #first by period, then height
+    while None in data: #non-oscillators:
+        data.remove(None)
+    stage_done('periods')
 
-num_periods = 0
-comments = ''
-lvcomments = '#C [[ COLOR LABEL Yellow LABELSIZE 30 LABELALPHA .75 LABELVIEWDIST 20 LABELZOOMRANGE 1 64 LABELANGLE 330 ]]\n'
-grid = {}
-column = 1 #column number
-column_x = 0 #column x offset
-period = 1
-period_y = 0 #y value at the beginning of the period
-x = 0
-y = 0
-pattern_dict = {}
-pattern_list = [] #pattern_list empties into pattern_dict at the end of each row, column, and period
-starting_digit_width = 4 #digit_width(1)
-max_period = max((i[1] * (i[1] != 1234567)) for i in data)
-while len(set(j[1] for j in data)): #this allows repeating periods that couldn't fit due to end of a column
-    x = column_x
-    rows = 0
-    for period in sorted(set(j[1] for j in data)): #lowest periods first; they get deleted as they're completed
-        if period == 1234567: #end of file
-            period_y = COL_HEIGHT + 100 #so that everything will be included
-            period = max_period #so it doesn't try to place a 7-digit number
-            create_column(pattern_dict, digit_width(period)-starting_digit_width)
-            data = [] #empties data to complete program
-            break
-        period = int(period)
-        #if period == 4:
-        #    continue
-        if y < period_y + 20 - spacing(period) and y > 0:
-            y = period_y + 20 - spacing(period) #so displayed digits don't conflict
-        elif y > 0:
-            y += 7 - spacing(period)
-        period_y = y #becomes the y value at the beginning of the period
-        period_str = str(period)
-        for digit in range(len(period_str)): #creates displayed digits
-            pattern_dict[-10*(len(period_str)-digit)+column_x, y, -1, rows] = (eval(num_dict[period_str[digit]]),1,14,8,0,0)
-        if y > 0:
-            for i in range(-digit_width(period),ROW_WIDTH-6,6):
-                pattern_dict[i+column_x, y-4, -1, rows] = (block,1,2,2,0,0)
-        period_patterns = list(filter(lambda a:a[1]==period, data)) #only patterns of the correct period
-        if period == 1: #still lifes are sorted by size up to 10 bits
-            period_patterns.sort(key=lambda a:min(11,sum(i == 1 for i in convert_rle_to_grid(a[0])[0].values())))
-        if period == 2: #p2 oscillators are sorted by size up to 14 bits
-            period_patterns.sort(key=lambda a:min(15,sum(i == 1 for i in convert_rle_to_grid(a[0])[0].values())))
-        if ROW_WIDTH <= sum((i[2] + spacing(period)) for i in period_patterns) - spacing(period) < ROW_WIDTH + digit_width(period):
-            y += 16 #moves the patterns down a line if they all fit on one line if moved down
-            x = column_x - digit_width(period)
-        period_patterns.append(('End of period', period, 0, period_patterns[-1][3], 0, 0))
-        #prevents the last pattern going past the height limit
-        for pattern in period_patterns:
-            if pattern[0] == 'End of period' and y + pattern[3] < COL_HEIGHT:
-                break
-            if x + pattern[2] >= ROW_WIDTH + column_x or y + pattern[3] >= COL_HEIGHT: #end of row or column
-                if y + pattern[3] >= COL_HEIGHT: #end of column
-                    create_column(pattern_dict, digit_width(period)-starting_digit_width)
-                    column += 1
-                    column_x += ROW_WIDTH + 3 + digit_width(period) + (digit_width(period)-starting_digit_width)
-                    starting_digit_width = digit_width(period)
-                    y = -1 #-1 is used to break out of loop
-                    period_y = 0
-                    pattern_list = []
-                    pattern_dict = {}
-                    rows = 0
-                    break
-                while x + len(pattern_list) <= ROW_WIDTH + column_x: #end of row
-                    for i in pattern_list:
-                        i[1] += i[2] #i[2] is the pattern number in the row; this spaces the row out to fill the full ROW_WIDTH cells
-                    x += len(pattern_list)
-                for i in pattern_list:
-                    pattern_dict[(i[1], y+i[0][5], i[2], rows)] = i[0] #puts the list into a dict
-                rows += 1
-                y += max(i[0][3] for i in pattern_list) + spacing(period) #maximum height
-                #will enter an infinite loop if a single pattern is more than ROW_WIDTH rows wide
-                x = column_x - digit_width(period) * (y - 16 >= period_y) #moves left if the digit doesn't interfere
-                pattern_list = []
-            pattern_list.append([pattern, x+pattern[4], len(pattern_list)])
-            x += pattern[2] + spacing(period)
-        if y == -1: #end of column; beginning of new column
-            y = 0
-            break
-        data = list(filter(lambda a:a[1] > period, data)) #removes a period when it's done
+    data.sort(key=lambda a:(a.period,a.height)) #first by period, then height
+    stage_done('sort')
+    oscillators = [i for i in data if i.rle != 'End of file']
+    return oscillators, profile
+
+def layout_stage(oscillators):
+    # pass 3: returns the columns from osclayout.layout and the number of periods
+    periods = []
+    def period_done(period):
         show_message('Pass 3 of 3:  Periods complete up to ' + str(period),0.02)
-        num_periods += 1
-        while x + len(pattern_list) <= ROW_WIDTH + column_x: #these lines are the same as the end-of-row lines
-            for i in pattern_list:
-                i[1] += i[2]
-            x += len(pattern_list)
-        for i in pattern_list:
-            pattern_dict[(i[1], y+i[0][5], i[2], rows)] = i[0]
-        rows += 1
-        y += pattern_list[-1][0][3] + spacing(period)
-        pattern_list = []
-        x = column_x
-final_list = []
-for i in grid:
-    if grid[i] == 1:
-        final_list.extend([i[0],i[1]])
-g.putcells(final_list)
+        periods.append(period)
+    columns = layout(oscillators, digit_glyphs, block_glyph, ROW_WIDTH, COL_HEIGHT, period_done)
+    stage_done('layout')
+    return columns, len(periods)
 
-comments = comments.replace(' #O', '\n#O')
-comments = comments.replace(' #C', '\n#C')
-comments = "#N Oscillator stamp collection\n#O Dean Hickerson, David Raucci, et al., updated " + today + '''
+HEADER = '''
 #C A collection of %s oscillators of %s different periods from 1
 #C to 40894. 
 #C
@@ -587,45 +437,161 @@ comments = "#N Oscillator stamp collection\n#O Dean Hickerson, David Raucci, et
 #C Frequencies listed are for 16x16 soups on an infinite grid. Most objects
 #C are 10 percent more common on a large torus (AF 2004, 2048x2048), at the
 #C expense of the block, which is about 6 percent less common, and the ship,
-#C which goes from 1 in 20 to 1 in 90.\n''' % (num_patterns, num_periods) + comments
-comments = comments.split('\n')
-comments2 = ''
-began = False
-space_len = 0
-for i in range(len(comments)):
-    if '1.0.0' in comments[i]: #end of introduction; beginning of patterns
-        began = True
-    if began and '#N' in comments[i]: #pattern name
-        try: #space_len is so that comments are aligned with the automatically generated pattern number
-            space_len = comments[i][3:].index(' ')+2
-        except ValueError:
-            space_len = len(comments[i])-1
-    if not began: #if still introduction
-        comments2 += comments[i] + '\n'
-    elif i != len(comments)-1 and '#O' in comments[i+1]: #puts pattern discoverer on name line with brackets
-        comments2 += comments[i] + ' [' + comments[i+1][3:] + ']\n'
-    elif '#C' in comments[i] and '----' not in comments[i]: #spaces comment lines to match pattern number
-        comments2 += '#C' + ' '*space_len*began + comments[i][3:] + '\n'
-    elif '#O' in comments[i]: #discoverers are put on the previous line; this is so that they're not duplicated
-        pass
+#C which goes from 1 in 20 to 1 in 90.\n'''
+
+def emit_stage(oscillators, columns, num_periods, output):
+    # pastes every column into the pattern, writes the comments, labels,
+    # catalog and store, and saves the stamp collection (or, in Golly, opens it and
+    # copies it to the clipboard)
+    num_patterns = len(oscillators) + 1 #this has always counted the end-of-file marker
+    comments = ''
+    lvcomments = ['#C [[ COLOR LABEL Yellow LABELSIZE 30 LABELALPHA .75 LABELVIEWDIST 20 LABELZOOMRANGE 1 64 LABELANGLE 330 ]]\n'] #lines, written out as they are
+    grid = Canvas()
+    placements = [] #(period.row.number, oscillator, x, y) for the catalog and the store
+    for pattern_dict, width_change in columns:
+        column_comments, labels = create_column(pattern_dict, width_change, grid, placements)
+        comments += column_comments
+        lvcomments.extend(label_line(*l) for l in labels)
+    counts['columns'] = len(columns)
+    stage_done('columns')
+    if CATALOG_FILE:
+        write_catalog(CATALOG_FILE, placements)
+    stage_done('catalog')
+    if STORE_FILE:
+        write_store(STORE_FILE, placements)
+    stage_done('store')
+
+    comments = comments.replace(' #O', '\n#O')
+    comments = comments.replace(' #C', '\n#C')
+    comments = "#N Oscillator stamp collection\n#O Dean Hickerson, David Raucci, et al., updated " + today + HEADER % (num_patterns, num_periods) + comments
+    comments = comments.split('\n')
+    comments2 = [] #lines of the final comment block
+    began = False
+    space_len = 0
+    for i in range(len(comments)):
+        if '1.0.0' in comments[i]: #end of introduction; beginning of patterns
+            began = True
+        if began and '#N' in comments[i]: #pattern name
+            try: #space_len is so that comments are aligned with the automatically generated pattern number
+                space_len = comments[i][3:].index(' ')+2
+            except ValueError:
+                space_len = len(comments[i])-1
+        if not began: #if still introduction
+            comments2.append(comments[i] + '\n')
+        elif i != len(comments)-1 and '#O' in comments[i+1]: #puts pattern discoverer on name line with brackets
+            comments2.append(comments[i] + ' [' + comments[i+1][3:] + ']\n')
+        elif '#C' in comments[i] and '----' not in comments[i]: #spaces comment lines to match pattern number
+            comments2.append('#C' + ' '*space_len*began + comments[i][3:] + '\n')
+        elif '#O' in comments[i]: #discoverers are put on the previous line; this is so that they're not duplicated
+            pass
+        else:
+            comments2.append(comments[i] + '\n')
+    first = next(i for i in range(len(comments2)) if '1.0.0' in comments2[i])
+    start = comments2[first].index('1.0.0')
+    intro, comments2[first] = comments2[first][:start], comments2[first][start:]
+    for i in range(first, len(comments2)): #comments file only has one #N, and it's at the very beginning
+        comments2[i] = comments2[i].replace("#N ","#C ").replace(' #C', '\n#C')
+    comments2[first] = intro + comments2[first]
+    stage_done('comments')
+
+    # show_message('Comments size: %s KB' % ((len(comments2)+500)//1000),0.5)
+    show_message('Comments size: %s KB text, %s KB LifeViewer labels' % ((sum(map(len, comments2))+500)//1000, (sum(map(len, lvcomments))+500)//1000),0)
+    if HEADLESS: # no clipboard to copy to, so write the finished stamp collection out directly
+        save_collection(output, comments2, grid.pairs(), lvcomments, g.getrule())
+        show_message('Saved ' + output + ', ' + str(int(time.time() - start_time)) + ' seconds',0)
     else:
-        comments2 += comments[i] + '\n'
-comments2_intro = comments2[:comments2.index('1.0.0')]
-comments2_patterns = comments2[comments2.index('1.0.0'):]
-comments2_patterns = comments2_patterns.replace("#N ","#C ") #comments file only has one #N, and it's at the very beginning
-comments2_patterns = comments2_patterns.replace(' #C', '\n#C')
-comments2 = comments2_intro + comments2_patterns
-    
-# show_message('Comments size: %s KB' % ((len(comments2)+500)//1000),0.5)
-show_message('Comments size: %s KB text, %s KB LifeViewer labels' % ((len(comments2)+500)//1000, (len(lvcomments)+500)//1000),0)
-tempname = os.path.join(g.getdir("temp"),"oscillators.rle")
-g.save(tempname, "rle")
-with open(tempname,"r") as f:
-    allrle = f.read()
-with open(tempname,"w") as f:
-    f.write(comments2 + "\n" + allrle)
-g.open(tempname)  # this integrates the comments into the currently open pattern file
-                  # there still seem to be some issues with keeping the comments after re-saving the file,
-                  # but I'll deal with that separately.  Meanwhile:
-g.note("Click OK to copy pattern to the clipboard, including comments at the beginning and LifeViewer commands at the end.")
-g.setclipstr(comments2 + "\n" + allrle + lvcomments)
+        tempname = os.path.join(g.getdir("temp"),"oscillators.rle")
+        pairs = grid.pairs()
+        save_collection(tempname, comments2, pairs, (), g.getrule(), False)
+        g.open(tempname)  # this integrates the comments into the currently open pattern file
+                          # there still seem to be some issues with keeping the comments after re-saving the file,
+                          # but I'll deal with that separately.  Meanwhile:
+        g.note("Click OK to copy pattern to the clipboard, including comments at the beginning and LifeViewer commands at the end.")
+        clip = io.StringIO()
+        write_collection(clip, comments2, pairs, lvcomments, g.getrule())
+        g.setclipstr(clip.getvalue())
+    stage_done('output')
+
+def resume(stage):
+    # the checkpoint left by the stage before this one
+    if not CHECKPOINT_DIR:
+        g.exit("Can't start at the %s stage without CHECKPOINT_DIR." % stage)
+    previous = STAGES[STAGES.index(stage)-1]
+    state = load_checkpoint(CHECKPOINT_DIR, previous)
+    if state is None:
+        g.exit("No %s checkpoint in %s; run the earlier stages first." % (previous, CHECKPOINT_DIR))
+    if previous == 'layout': #the columns refer to the oscillators of the analysis they were made from
+        analysis = load_checkpoint(CHECKPOINT_DIR, 'analyze')
+        if analysis is None or analysis['stamp'] != state['analysis']:
+            g.exit("The layout checkpoint in %s is older than the analysis; start at the layout stage." % CHECKPOINT_DIR)
+        state['oscillators'] = analysis['oscillators']
+        state['rule'] = analysis.get('rule')
+    return state
+
+def build(first='parse', last='emit', source=SOURCE_FILE, output=OUTPUT_FILE):
+    # runs the stages from first to last, each saving a checkpoint for the
+    # next; a build that doesn't start with parse picks up from the checkpoint
+    # of the stage before it
+    global RULE
+    stages = STAGES[STAGES.index(first):STAGES.index(last)+1]
+    state = resume(first) if first != 'parse' else {}
+    RULE = rule_name(state.get('rule') or RULE) # the oscillators of a checkpoint were run in its rule
+    g.setrule(RULE)
+    # clear the universe before starting to build stamp collection
+    g.new("oscillators.rle")
+    profile = None
+    if 'records' in state:
+        source, records = state['source'], records_from_json(state['records'])
+        counts['patterns'] = len(records)
+    if 'oscillators' in state:
+        oscillators = oscillators_from_json(state['oscillators'])
+    if 'columns' in state:
+        columns = columns_from_json(state['columns'], oscillators, digit_glyphs, block_glyph)
+        num_periods = state['periods']
+    if 'parse' in stages:
+        source, records = parse_stage(source)
+        if CHECKPOINT_DIR:
+            save_checkpoint(CHECKPOINT_DIR, 'parse', {'source': source, 'records': records_to_json(records)})
+    if 'analyze' in stages:
+        oscillators, profile = analyze_stage(source, records)
+        if CHECKPOINT_DIR:
+            analysis = save_checkpoint(CHECKPOINT_DIR, 'analyze', {'rule': RULE, 'oscillators': oscillators_to_json(oscillators)})
+    if 'layout' in stages:
+        columns, num_periods = layout_stage(oscillators)
+        if CHECKPOINT_DIR:
+            if 'analyze' not in stages:
+                analysis = state['stamp']
+            save_checkpoint(CHECKPOINT_DIR, 'layout', {'analysis': analysis, 'periods': num_periods,
+                            'columns': columns_to_json(columns, oscillators, digit_glyphs, block_glyph)})
+    if 'emit' in stages:
+        emit_stage(oscillators, columns, num_periods, output)
+    if TIMINGS_FILE:
+        with open(TIMINGS_FILE, "w") as f:
+            json.dump(dict(counts, stages=stage_times, total=time.time() - start_time), f, indent=1)
+    if profile:
+        g.note('Pattern profile saved to %s\n' % PROFILE_FILE + summary(profile))
+
+def main():
+    global ROW_WIDTH, COL_HEIGHT, CHECKPOINT_DIR, RULE
+    parser = argparse.ArgumentParser(description='Build the oscillator stamp collection from oscillators.txt. '
+                                     'The stages are ' + ', '.join(STAGES) + '; each one saves a checkpoint, '
+                                     'so the later ones can be run again on their own, e.g. --from layout.')
+    parser.add_argument('source', nargs='?', default=SOURCE_FILE)
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE)
+    parser.add_argument('--from', dest='first', choices=STAGES, default='parse', help='start here, from the checkpoint of the stage before')
+    parser.add_argument('--to', dest='last', choices=STAGES, default='emit', help='stop after this stage')
+    parser.add_argument('--checkpoints', default=CHECKPOINT_DIR, help='folder for the checkpoints (default %(default)s)')
+    parser.add_argument('--row-width', type=int, default=ROW_WIDTH)
+    parser.add_argument('--col-height', type=int, default=COL_HEIGHT)
+    parser.add_argument('--rule', type=rule_name, default=RULE, help='build from the entries in this outer-totalistic rule (default %(default)s)')
+    args = parser.parse_args()
+    if STAGES.index(args.first) > STAGES.index(args.last):
+        parser.error('--from %s comes after --to %s' % (args.first, args.last))
+    ROW_WIDTH, COL_HEIGHT, CHECKPOINT_DIR, RULE = args.row_width, args.col_height, args.checkpoints, args.rule
+    build(args.first, args.last, args.source, args.output)
+
+if __name__ == '__main__':
+    if HEADLESS:
+        main()
+    else: # Golly runs scripts as __main__ too, with nothing to parse
+        build()
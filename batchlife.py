@@ -0,0 +1,257 @@
+# batchlife.py
+# Finds the periods of many small patterns at once.  The patterns are put in
+# equal-sized tiles, with a guard band of empty cells around each one, on a
+# single board packed 64 cells to a word, and the whole board is stepped with
+# bitwise operations.  After every generation each tile's population, bounding
+# box and a hash of its contents are updated, and a tile's period is recorded
+# the first time it matches its starting state again.
+#
+# A tile whose pattern gets too close to its edge is cleared and reported as
+# unresolved, as are patterns that die or don't repeat within max_gens, so the
+# caller can fall back on simulating them one at a time.
+
+from functools import partial
+from canonical import LowestPhases
+from liferule import DEFAULT_RULE, is_life, transitions
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GUARD = 16 # empty cells around each pattern
+MARGIN = 2 # a tile is abandoned once a cell comes this close to its edge
+MAX_SIZE = 200 # bigger patterns aren't worth batching
+MAX_TILES = 4096 # tiles per board
+
+if np is not None:
+    _ONE = np.uint64(1)
+    _TOP = np.uint64(63)
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+def _shifted(board):
+    # (west, east): each cell replaced by its left and right neighbour
+    prev = np.zeros_like(board)
+    prev[:, 1:] = board[:, :-1]
+    nxt = np.zeros_like(board)
+    nxt[:, :-1] = board[:, 1:]
+    return (board << _ONE) | (prev >> _TOP), (board >> _ONE) | (nxt << _TOP)
+
+def step(board):
+    # one generation of B3/S23 on a packed board (rows of uint64 words, bit i of word w is x = 64*w+i)
+    west, east = _shifted(board)
+    h0 = west ^ board ^ east # count of each row's three cells, as two bits
+    h1 = (west & board) | (east & (west ^ board))
+    p0 = west ^ east # the same row only contributes its two neighbours
+    p1 = west & east
+    u0 = np.zeros_like(board); u0[1:] = h0[:-1]
+    u1 = np.zeros_like(board); u1[1:] = h1[:-1]
+    d0 = np.zeros_like(board); d0[:-1] = h0[1:]
+    d1 = np.zeros_like(board); d1[:-1] = h1[1:]
+    s0 = u0 ^ p0 ^ d0
+    c0 = (u0 & p0) | (d0 & (u0 ^ p0))
+    # the neighbour count is s0 + 2*t, where t = u1+p1+d1+c0; a cell lives if t == 1 and (s0 or alive)
+    a = u1 ^ p1
+    b = d1 ^ c0
+    t1 = (a ^ b) & ~(u1 & p1) & ~(d1 & c0)
+    return t1 & (s0 | board)
+
+def step_rule(board, table):
+    # one generation of any outer-totalistic rule, given its
+    # liferule.transitions table: the neighbour count is added up as four
+    # bit planes, and the table becomes an OR of the counts that give a live
+    # cell, masked by the cells being dead if only birth does, or alive if
+    # only survival does
+    west, east = _shifted(board)
+    h0 = west ^ board ^ east
+    h1 = (west & board) | (east & (west ^ board))
+    p0 = west ^ east
+    p1 = west & east
+    u0 = np.zeros_like(board); u0[1:] = h0[:-1]
+    u1 = np.zeros_like(board); u1[1:] = h1[:-1]
+    d0 = np.zeros_like(board); d0[:-1] = h0[1:]
+    d1 = np.zeros_like(board); d1[:-1] = h1[1:]
+    # rows above and below (0 to 6), then the cell's own row (0 to 8)
+    s0 = u0 ^ d0
+    k0 = u0 & d0
+    s1 = u1 ^ d1 ^ k0
+    s2 = (u1 & d1) | (k0 & (u1 ^ d1))
+    n0 = s0 ^ p0
+    k1 = s0 & p0
+    n1 = s1 ^ p1 ^ k1
+    k2 = (s1 & p1) | (k1 & (s1 ^ p1))
+    n2 = s2 ^ k2
+    n3 = s2 & k2 # only set for 8, when the other bits are clear
+    low = {} # count % 4 -> cells whose count has those two low bits
+    high = {} # count // 4 -> cells with that count // 4
+    def equals(count):
+        if count == 8:
+            return n3
+        if count & 3 not in low:
+            low[count & 3] = (n0 if count & 1 else ~n0) & (n1 if count & 2 else ~n1)
+        if count >> 2 not in high:
+            high[count >> 2] = n2 & ~n3 if count & 4 else ~(n2 | n3)
+        return low[count & 3] & high[count >> 2]
+    masks = {} # (born, survives) -> cells with a count that gives that
+    for count in range(9):
+        key = (table[count], table[9 + count])
+        if any(key):
+            match = equals(count)
+            masks[key] = masks[key] | match if key in masks else match
+    result = masks.get((1, 1), np.zeros_like(board))
+    if (1, 0) in masks:
+        result = result | (masks[1, 0] & ~board)
+    if (0, 1) in masks:
+        result = result | (masks[0, 1] & board)
+    return result
+
+def stepper(rule=DEFAULT_RULE):
+    # the step function for rule; B3/S23 has its own shorter one
+    if is_life(rule):
+        return step
+    return partial(step_rule, table=transitions(rule))
+
+def _highest_bit(words):
+    # position of the highest set bit of each (nonzero) word
+    pos = np.zeros(words.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        shifted = words >> np.uint64(s)
+        nonzero = shifted != 0
+        pos += s * nonzero
+        words = np.where(nonzero, shifted, words)
+    return pos
+
+def _tile_boxes(tiles, tile_width):
+    # per-tile (minx, miny, maxx, maxy) in tile coordinates, for tiles of shape (n, TH, TW);
+    # empty tiles get minx = miny = a big number and maxx = maxy = -1
+    th = tiles.shape[1]
+    rows = (tiles != 0).any(axis=2) # (n, TH)
+    has = rows.any(axis=1)
+    miny = np.where(has, rows.argmax(axis=1), 1 << 30)
+    maxy = np.where(has, th - 1 - rows[:, ::-1].argmax(axis=1), -1)
+    cols = np.bitwise_or.reduce(tiles, axis=1) # (n, TW)
+    nonzero = cols != 0
+    first = nonzero.argmax(axis=1)
+    last = tile_width - 1 - nonzero[:, ::-1].argmax(axis=1)
+    first_word = np.take_along_axis(cols, first[:, None], 1)[:, 0]
+    last_word = np.take_along_axis(cols, last[:, None], 1)[:, 0]
+    lowest = first_word & (~first_word + _ONE)
+    minx = np.where(has, 64*first + _highest_bit(lowest), 1 << 30)
+    maxx = np.where(has, 64*last + _highest_bit(last_word), -1)
+    return minx, miny, maxx, maxy
+
+def _tile_cells(tile):
+    # a tile's live cells as (x,y) pairs in tile coordinates
+    ys, xs = np.nonzero(np.unpackbits(tile.view(np.uint8), axis=1, bitorder='little'))
+    return list(zip(xs.tolist(), ys.tolist()))
+
+def _coordinates(cells):
+    # (xs, ys) of a Golly cell list or an (N, 2) array from rledecode
+    if isinstance(cells, np.ndarray):
+        return cells[:, 0].astype(np.int64), cells[:, 1].astype(np.int64)
+    return np.array(cells[::2], dtype=np.int64), np.array(cells[1::2], dtype=np.int64)
+
+def _run_board(patterns, tile_width, tile_height, max_gens, compact=False, step=step):
+    # The tiles are stacked in one column, so tile n is rows n*TH to (n+1)*TH-1
+    # of the board and finished tiles can be dropped by slicing.  patterns are
+    # (xs, ys) arrays, and step is from stepper().
+    count = len(patterns)
+    board = np.zeros((count * tile_height, tile_width), dtype=np.uint64)
+    origins = []
+    for n, (xs, ys) in enumerate(patterns):
+        x0, y0 = xs.min(), ys.min()
+        bx = xs - x0 + GUARD
+        by = ys - y0 + GUARD + n * tile_height
+        np.bitwise_or.at(board, (by, bx // 64), _ONE << (bx % 64).astype(np.uint64))
+        origins.append((int(x0) - GUARD, int(y0) - GUARD))
+    shape = (-1, tile_height, tile_width)
+    zobrist = np.random.default_rng(0).integers(0, 1 << 63, size=(tile_height, tile_width), dtype=np.uint64) | _ONE
+    def hashes(tiles):
+        return (tiles * zobrist).sum(axis=(1, 2), dtype=np.uint64)
+    initial = board.reshape(shape).copy()
+    initial_hash = hashes(initial)
+    minx, miny, maxx, maxy = _tile_boxes(initial, tile_width)
+    index = np.arange(count) # which pattern each tile on the board holds
+    period = np.zeros(count, dtype=np.int64) # 0 while unresolved
+    box = np.stack([minx, miny, maxx, maxy])
+    population = np.zeros(count, dtype=np.int64)
+    peak = _POPCOUNT[initial.view(np.uint8)].sum(axis=(1, 2)).astype(np.int64)
+    # for compact, each tile's smallest (bounding box area, population) so far, and that phase if it isn't the first
+    best_key = (box[2] - box[0] + 1) * (box[3] - box[1] + 1) * (1 << 20) + peak
+    best = [None] * count
+    lowest = []
+    for xs, ys in patterns:
+        lowest.append(LowestPhases())
+        lowest[-1].add(len(xs), list(zip(xs.tolist(), ys.tolist())))
+    for gen in range(1, max_gens + 1):
+        board = step(board)
+        tiles = board.reshape(shape)
+        population[index] = _POPCOUNT[tiles.view(np.uint8)].sum(axis=(1, 2))
+        peak[index] = np.maximum(peak[index], population[index])
+        bx0, by0, bx1, by1 = _tile_boxes(tiles, tile_width)
+        box[0, index] = np.minimum(box[0, index], bx0)
+        box[1, index] = np.minimum(box[1, index], by0)
+        box[2, index] = np.maximum(box[2, index], bx1)
+        box[3, index] = np.maximum(box[3, index], by1)
+        near_edge = (bx0 < MARGIN) | (by0 < MARGIN) | (bx1 >= 64*tile_width - MARGIN) | (by1 >= tile_height - MARGIN)
+        done = (population[index] == 0) | near_edge # died, or about to run into a neighbouring tile
+        matches = np.flatnonzero(~done & (hashes(tiles) == initial_hash))
+        for t in matches: # confirm, in case two states share a hash
+            if (tiles[t] == initial[t]).all():
+                period[index[t]] = gen
+                done[t] = True
+        if compact:
+            key = (bx1 - bx0 + 1) * (by1 - by0 + 1) * (1 << 20) + population[index]
+            for t in np.flatnonzero(~done & (key < best_key[index])):
+                best_key[index[t]] = key[t]
+                best[index[t]] = _tile_cells(tiles[t])
+        for t in np.flatnonzero(~done & (population[index] <= [lowest[n].population for n in index])):
+            lowest[index[t]].add(int(population[index[t]]), _tile_cells(tiles[t]))
+        if done.any(): # drop finished tiles so the board only holds ones still running
+            keep = ~done
+            index = index[keep]
+            if not len(index):
+                break
+            board = tiles[keep].reshape(-1, tile_width)
+            initial = initial[keep]
+            initial_hash = initial_hash[keep]
+    results = []
+    for n in range(count):
+        if not period[n]:
+            results.append(None)
+        else:
+            ox, oy = origins[n]
+            compact_phase = best[n] and [(x + ox, y + oy) for x, y in best[n]]
+            results.append((int(period[n]), (int(box[0, n]) + ox, int(box[1, n]) + oy, int(box[2, n]) + ox, int(box[3, n]) + oy), int(peak[n]),
+                            lowest[n].phases, compact_phase))
+    return results
+
+def find_periods(patterns, max_gens=999, compact=False, rule=DEFAULT_RULE):
+    # For each Golly cell list (or (N, 2) array of (x,y), as from
+    # rledecode.decode_rles), returns (period, (minx, miny, maxx, maxy), peak,
+    # phases, best) with the bounding box over generations 0 to period, the
+    # largest population, the phases with the smallest population (as (x,y)
+    # pairs, for canonical.canonical_hash), and, if compact is set and some
+    # other phase has a smaller bounding box (then population) than the one
+    # given, that phase; otherwise best is None.  The result is None if the
+    # pattern couldn't be settled here (too big, died, escaped its tile or no
+    # period <= max_gens).  The patterns are run in rule.
+    step = stepper(rule)
+    results = [None] * len(patterns)
+    groups = {}
+    coordinates = [None] * len(patterns)
+    for n, cells in enumerate(patterns):
+        if not len(cells):
+            continue
+        xs, ys = coordinates[n] = _coordinates(cells)
+        w = int(xs.max() - xs.min()) + 1
+        h = int(ys.max() - ys.min()) + 1
+        if w > MAX_SIZE or h > MAX_SIZE:
+            continue
+        size = ((w + 2*GUARD + 63) // 64, (h + 2*GUARD + 7) // 8 * 8) # words across, rows down
+        groups.setdefault(size, []).append(n)
+    for (tile_width, tile_height), members in groups.items():
+        for start in range(0, len(members), MAX_TILES):
+            chunk = members[start:start + MAX_TILES]
+            for n, result in zip(chunk, _run_board([coordinates[n] for n in chunk], tile_width, tile_height, max_gens, compact, step)):
+                results[n] = result
+    return results
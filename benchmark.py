@@ -0,0 +1,140 @@
+# benchmark.py
+# Times each stage of the stamp-collection build (parse, periods, sort, layout,
+# columns, catalog, store, comments, output) on oscillators.txt and on
+# bigger synthetic collections made from it.
+#
+# Every build runs headless (lifeengine standing in for Golly) in a scratch
+# folder, first with no cache ("cold") and then again with the one the first
+# run left behind ("warm").  Results are saved as JSON, and
+# --compare prints the ratio of each stage against an earlier results file.
+#
+#   python benchmark.py                       # scales 1, 10 and 100
+#   python benchmark.py --scales 1,10 --output before.json
+#   python benchmark.py --scales 1,10 --compare before.json
+#
+# A copy n of an entry in a scaled collection is the same oscillator rotated or
+# reflected (orientation n % 8), renamed "<name> (copy n)", so the copies don't
+# all sort into the same place and are different patterns as far as the cache
+# is concerned (up to 8 copies).  Every copy is still a rotation or reflection
+# of its original, though, so the build's duplicate check (see canonical.py)
+# flags all of them: at scales 10 and 100 each cold run ends with a possible
+# duplicates warning listing every copy.  That warning is expected here.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import lifeengine
+from canonical import ORIENTATIONS
+from oscreader import read_records
+from rletools import encode_rle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def transformed(record, n):
+    # the text of copy n of a record
+    if record.header is None or 'B3/S23' not in record.header:
+        return record.text
+    cells = lifeengine.parse(record.rle)
+    a, b, c, d = ORIENTATIONS[n % 8]
+    moved = []
+    for x, y in zip(cells[::2], cells[1::2]):
+        moved.extend([a*x + b*y, c*x + d*y])
+    lines = []
+    for line in record.text.split('\n'):
+        if line.startswith('x ') or line.startswith('x='):
+            break
+        if line.startswith('#N'):
+            line = line + ' (copy %d)' % n
+        lines.append(line)
+    rle = encode_rle(moved)
+    if record.extended:
+        rle += '%' + str(record.extended)
+    return '\n'.join(lines + [rle])
+
+def make_corpus(source, scale, filename):
+    # writes scale copies of every entry of source to filename; returns the number of entries
+    count = 0
+    with open(filename, 'w') as f:
+        for record in read_records(source):
+            for n in range(scale):
+                f.write((record.text if n == 0 else transformed(record, n)) + '\n\n')
+                count += 1
+    return count
+
+def run_build(folder):
+    # runs b3s23osc.py in folder and returns its timings
+    timings = os.path.join(folder, 'timings.json')
+    env = dict(os.environ, B3S23OSC_TIMINGS=timings)
+    started = time.time()
+    subprocess.run([sys.executable, os.path.join(HERE, 'b3s23osc.py')], cwd=folder, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(timings) as f:
+        result = json.load(f)
+    result['wall'] = time.time() - started
+    return result
+
+def benchmark(source, scales, keep=False):
+    results = []
+    for scale in scales:
+        folder = tempfile.mkdtemp(prefix='b3s23osc-bench-')
+        try:
+            started = time.time()
+            count = make_corpus(source, scale, os.path.join(folder, 'oscillators.txt'))
+            print('scale %s: %s entries (generated in %.1f s)' % (scale, count, time.time() - started))
+            for run in ('cold', 'warm'):
+                result = run_build(folder)
+                result.update(scale=scale, run=run)
+                results.append(result)
+                print('  %s: %.2f s  ' % (run, result['total']) +
+                      '  '.join('%s %.2f' % (k, v) for k, v in result['stages'].items()))
+        finally:
+            if keep:
+                print('  kept ' + folder)
+            else:
+                shutil.rmtree(folder)
+    return results
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'python': platform.python_version(), 'numpy': numpy_version, 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'engine': 'lifeengine %s' % lifeengine.ENGINE_VERSION,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+def compare(old, new):
+    # prints new/old time for each stage of the builds both files have
+    before = dict(((r['scale'], r['run']), r) for r in old['results'])
+    for r in new['results']:
+        o = before.get((r['scale'], r['run']))
+        if not o:
+            continue
+        ratios = ['%s %.2fx' % (k, v / o['stages'][k]) for k, v in r['stages'].items() if o['stages'].get(k)]
+        print('scale %s %s: total %.2fx  ' % (r['scale'], r['run'], r['total'] / o['total']) + '  '.join(ratios))
+
+def main():
+    parser = argparse.ArgumentParser(description='Time each stage of the b3s23osc.py build.')
+    parser.add_argument('--source', default=os.path.join(HERE, 'oscillators.txt'))
+    parser.add_argument('--scales', default='1,10,100', help='comma-separated copies of each entry (default 1,10,100)')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='an earlier results file to compare against')
+    parser.add_argument('--keep', action='store_true', help="don't delete the scratch folders")
+    args = parser.parse_args()
+    results = {'environment': environment(), 'results': benchmark(args.source, [int(s) for s in args.scales.split(',')], args.keep)}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print('Saved ' + args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# canonical.py
+# A hash that is the same for every phase, rotation and reflection of an
+# oscillator, so the same object entered twice can be found by lookup.
+#
+# The hash is of the smallest "form" among the 8 orientations of every phase,
+# but phases are only compared if they have the smallest population, since
+# population doesn't depend on orientation; that's what LowestPhases keeps
+# while the pattern is being run.  A form is the width of the oriented
+# pattern and the sorted list of y*width+x for its cells, moved to (0,0),
+# which is much faster to compare than lists of pairs.
+
+import hashlib
+
+ORIENTATIONS = ((1,0,0,1), (0,-1,1,0), (-1,0,0,-1), (0,1,-1,0), (-1,0,0,1), (0,1,1,0), (1,0,0,-1), (0,-1,-1,0))
+
+class LowestPhases:
+    # the phases with the smallest population seen so far
+    def __init__(self):
+        self.population = None
+        self.phases = []
+
+    def wants(self, population):
+        return self.population is None or population <= self.population
+
+    def add(self, population, cells):
+        # cells are (x,y) pairs; call only if wants(population)
+        if self.population is None or population < self.population:
+            self.population = population
+            self.phases = []
+        self.phases.append(cells)
+
+def canonical_form(cells):
+    # the smallest form of one phase, given as (x,y) pairs anywhere in the plane
+    if not cells:
+        return (0, [])
+    left = min(c[0] for c in cells)
+    top = min(c[1] for c in cells)
+    w = max(c[0] for c in cells) - left + 1
+    h = max(c[1] for c in cells) - top + 1
+    if left or top:
+        cells = [(x - left, y - top) for x, y in cells]
+    forms = []
+    for a, b, c, d in ORIENTATIONS:
+        width = w if a else h
+        x0 = min(0, a*(w-1)) + min(0, b*(h-1)) # where the transformed box starts
+        y0 = min(0, c*(w-1)) + min(0, d*(h-1))
+        forms.append((width, sorted([(c*x + d*y - y0)*width + a*x + b*y - x0 for x, y in cells])))
+    return min(forms)
+
+def canonical_hash(phases):
+    # phases is a list of cell-pair lists (e.g. LowestPhases.phases)
+    return hashlib.sha1(repr(min(canonical_form(p) for p in phases)).encode()).hexdigest()
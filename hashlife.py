@@ -0,0 +1,287 @@
+# hashlife.py
+# A small quadtree/hashlife engine for checking very long periods (the "%"
+# entries of oscillators.txt) without stepping every generation.
+#
+# Besides the usual memoized "result" (the centre of a node 2^j generations
+# later), every step also memoizes an "envelope": the union of the centre's
+# live cells over all of those generations.  That gives the bounding box over
+# a whole period in about log(period) steps, which is what the stamp
+# collection needs for spacing.
+#
+# Identical nodes are shared through a weak table, and the memo tables are
+# LRU caches of at most MAX_CACHE entries each, so memory stays bounded even
+# for long runs; evicted entries are simply recomputed when needed again.
+
+import weakref
+from collections import OrderedDict
+from liferule import DEFAULT_RULE, rule_name, transitions
+
+MAX_CACHE = 1 << 20
+
+class Node:
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'pop', '__weakref__')
+
+    def __init__(self, nw, ne, sw, se, level, pop):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level
+        self.pop = pop
+
+OFF = Node(None, None, None, None, 0, 0)
+ON = Node(None, None, None, None, 0, 1)
+
+_nodes = weakref.WeakValueDictionary()
+_zeros = [OFF]
+
+class LRU(OrderedDict):
+    def __init__(self, maxsize):
+        OrderedDict.__init__(self)
+        self.maxsize = maxsize
+
+    def get(self, key):
+        value = OrderedDict.get(self, key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self[key] = value
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+        return value
+
+_steps = LRU(MAX_CACHE)
+_unions = LRU(MAX_CACHE)
+_boxes = LRU(MAX_CACHE)
+_lut = []
+_rule = [DEFAULT_RULE]
+
+def clear_caches():
+    _steps.clear()
+    _unions.clear()
+    _boxes.clear()
+
+def set_rule(rulestring):
+    # the memoized steps only hold for one rule, so they're dropped when it changes
+    rulestring = rule_name(rulestring)
+    if rulestring != _rule[0]:
+        _rule[0] = rulestring
+        del _lut[:]
+        _steps.clear()
+
+def node(nw, ne, sw, se):
+    key = (nw, ne, sw, se)
+    n = _nodes.get(key)
+    if n is None:
+        n = Node(nw, ne, sw, se, nw.level + 1, nw.pop + ne.pop + sw.pop + se.pop)
+        _nodes[key] = n
+    return n
+
+def zero(level):
+    while len(_zeros) <= level:
+        z = _zeros[-1]
+        _zeros.append(node(z, z, z, z))
+    return _zeros[level]
+
+def center(n):
+    return node(n.nw.se, n.ne.sw, n.sw.ne, n.se.nw)
+
+def _horizontal(w, e):
+    return node(w.ne, e.nw, w.se, e.sw)
+
+def _vertical(n, s):
+    return node(n.sw, n.se, s.nw, s.ne)
+
+def _build_lut():
+    # next state of the centre 2x2 of every 4x4 block; bit 4*y+x is cell (x,y)
+    table = transitions(_rule[0])
+    for bits in range(1 << 16):
+        out = 0
+        for x, y in ((1, 1), (2, 1), (1, 2), (2, 2)):
+            count = sum(bits >> (4*(y+dy) + x+dx) & 1 for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+            alive = bits >> (4*y + x) & 1
+            if table[9*alive + count]:
+                out |= 1 << (2*(y-1) + x-1)
+        _lut.append(out)
+
+def _base(n):
+    # one generation of a level-2 node (4x4), returning its level-1 centre
+    if not _lut:
+        _build_lut()
+    bits = 0
+    for qx, qy, q in ((0, 0, n.nw), (2, 0, n.ne), (0, 2, n.sw), (2, 2, n.se)):
+        for x, y, c in ((0, 0, q.nw), (1, 0, q.ne), (0, 1, q.sw), (1, 1, q.se)):
+            if c.pop:
+                bits |= 1 << (4*(qy+y) + qx+x)
+    out = _lut[bits]
+    return node(*[ON if out >> b & 1 else OFF for b in range(4)])
+
+def union(a, b):
+    # cells alive in either node (same level)
+    if not a.pop or b is a:
+        return b
+    if not b.pop:
+        return a
+    if a.level == 0:
+        return ON
+    found = _unions.get((a, b))
+    if found is None:
+        found = _unions.put((a, b), node(union(a.nw, b.nw), union(a.ne, b.ne), union(a.sw, b.sw), union(a.se, b.se)))
+    return found
+
+def advance(n, j):
+    # Returns (result, envelope) for a node of level k >= 2 and j <= k-2:
+    # result is the centre of n after 2^j generations, and envelope holds
+    # every cell of the centre that is alive at some generation 0..2^j.
+    k = n.level
+    if not n.pop:
+        return zero(k-1), zero(k-1)
+    key = (n, j)
+    found = _steps.get(key)
+    if found is not None:
+        return found
+    if k == 2:
+        result = _base(n)
+        return _steps.put(key, (result, union(center(n), result)))
+    subnodes = [[n.nw, _horizontal(n.nw, n.ne), n.ne],
+                [_vertical(n.nw, n.sw), center(n), _vertical(n.ne, n.se)],
+                [n.sw, _horizontal(n.sw, n.se), n.se]]
+    if j == k-2: # first half of the time step
+        stage = [[advance(s, j-1) for s in row] for row in subnodes]
+        a = [[s[0] for s in row] for row in stage]
+        e = [[s[1] for s in row] for row in stage]
+        quarters = [center(node(e[y][x], e[y][x+1], e[y+1][x], e[y+1][x+1])) for y in (0, 1) for x in (0, 1)]
+        first_envelope = node(*quarters)
+        j -= 1
+    else: # the whole step fits in the second half
+        a = [[center(s) for s in row] for row in subnodes]
+        first_envelope = None
+    stage = [advance(node(a[y][x], a[y][x+1], a[y+1][x], a[y+1][x+1]), j) for y in (0, 1) for x in (0, 1)]
+    result = node(*[s[0] for s in stage])
+    envelope = node(*[s[1] for s in stage])
+    if first_envelope is not None:
+        envelope = union(first_envelope, envelope)
+    return _steps.put(key, (result, envelope))
+
+def bounding_box(n):
+    # (minx, miny, maxx, maxy) of the live cells relative to the node's corner, or None
+    if not n.pop:
+        return None
+    if n.level == 0:
+        return (0, 0, 0, 0)
+    found = _boxes.get(n)
+    if found is None:
+        half = 1 << (n.level - 1)
+        boxes = [(b[0]+dx, b[1]+dy, b[2]+dx, b[3]+dy) for q, dx, dy in
+                 ((n.nw, 0, 0), (n.ne, half, 0), (n.sw, 0, half), (n.se, half, half)) for b in [bounding_box(q)] if b]
+        found = _boxes.put(n, (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                               max(b[2] for b in boxes), max(b[3] for b in boxes)))
+    return found
+
+def from_cells(cells):
+    # builds (node, x, y) from a Golly cell list; (x, y) is the node's top-left corner
+    pairs = set(zip(cells[::2], cells[1::2]))
+    if not pairs:
+        return zero(3), 0, 0
+    x0 = min(c[0] for c in pairs)
+    y0 = min(c[1] for c in pairs)
+    size = max(max(c[0] for c in pairs) - x0, max(c[1] for c in pairs) - y0) + 1
+    level = 3
+    while (1 << level) < size:
+        level += 1
+    def build(cells, level, x, y):
+        if not cells:
+            return zero(level)
+        if level == 0:
+            return ON
+        half = 1 << (level - 1)
+        quads = ([], [], [], [])
+        for c in cells:
+            quads[(c[0] >= x + half) + 2*(c[1] >= y + half)].append(c)
+        return node(build(quads[0], level-1, x, y), build(quads[1], level-1, x+half, y),
+                    build(quads[2], level-1, x, y+half), build(quads[3], level-1, x+half, y+half))
+    return build(list(pairs), level, x0, y0), x0, y0
+
+def to_cells(n, x, y):
+    # Golly cell list, row by row
+    pairs = []
+    def collect(n, x, y):
+        if not n.pop:
+            return
+        if n.level == 0:
+            pairs.append((x, y))
+            return
+        half = 1 << (n.level - 1)
+        collect(n.nw, x, y)
+        collect(n.ne, x+half, y)
+        collect(n.sw, x, y+half)
+        collect(n.se, x+half, y+half)
+    collect(n, x, y)
+    cells = []
+    for cx, cy in sorted(pairs, key=lambda c:(c[1], c[0])):
+        cells.extend([cx, cy])
+    return cells
+
+def _expand(n, x, y):
+    # the same pattern inside a node twice as big
+    z = zero(n.level - 1)
+    half = 1 << (n.level - 1)
+    return (node(node(z, z, z, n.nw), node(z, z, n.ne, z), node(z, n.sw, z, z), node(n.se, z, z, z)),
+            x - half, y - half)
+
+def run(cells, gens):
+    # Returns (cells, box): the cell list after gens generations, and the
+    # bounding box (minx, miny, maxx, maxy) of every generation from 0 to gens
+    # (None if the pattern is empty).
+    n, x, y = from_cells(cells)
+    b = bounding_box(n)
+    box = b and (b[0]+x, b[1]+y, b[2]+x, b[3]+y)
+    j = 0
+    while gens >> j:
+        if gens >> j & 1:
+            # grow until the pattern is well inside the centre, so that nothing
+            # can reach the edge of the result in 2^j generations
+            while True:
+                b = bounding_box(n)
+                inner = 3 << (n.level - 3)
+                outer = 5 << (n.level - 3)
+                if n.level >= j + 3 and (not b or (b[0] >= inner and b[1] >= inner and b[2] < outer and b[3] < outer)):
+                    break
+                n, x, y = _expand(n, x, y)
+            n, envelope = advance(n, j)
+            x += 1 << (n.level - 1)
+            y += 1 << (n.level - 1)
+            b = bounding_box(envelope)
+            if b:
+                b = (b[0]+x, b[1]+y, b[2]+x, b[3]+y)
+                box = b if not box else (min(box[0], b[0]), min(box[1], b[1]), max(box[2], b[2]), max(box[3], b[3]))
+        j += 1
+    return to_cells(n, x, y), box
+
+def prime_factors(number):
+    factors = []
+    p = 2
+    while p * p <= number:
+        if number % p == 0:
+            factors.append(p)
+            while number % p == 0:
+                number //= p
+        p += 1
+    if number > 1:
+        factors.append(number)
+    return factors
+
+def verify_period(cells, period, rule=DEFAULT_RULE):
+    # Returns (true_period, box) for cells run in rule.  true_period is None
+    # if the pattern doesn't return to its starting state after period
+    # generations; otherwise it's the smallest divisor of period that works,
+    # found by trying period/p for each prime factor p.  box is the bounding
+    # box over the whole cycle.
+    set_rule(rule)
+    initial = to_cells(*from_cells(cells))
+    final, box = run(initial, period)
+    if final != initial:
+        return None, box
+    for p in prime_factors(period):
+        while period % p == 0 and run(initial, period // p)[0] == initial:
+            period //= p
+    return period, box
@@ -0,0 +1,207 @@
+# lifeengine.py
+# A headless stand-in for the parts of Golly's scripting API that b3s23osc.py uses.
+# b3s23osc.py imports this module as "g" when the golly module isn't available,
+# so the stamp collection can be rebuilt on machines without Golly (batch servers,
+# worker processes, etc.).  Patterns are cell lists in Golly's format: [x0,y0,x1,y1,...]
+#
+# The universe is unbounded.  Evolution uses NumPy when it's installed and falls
+# back on a pure-Python neighbour count otherwise; both give identical results.
+
+import builtins
+import os
+import sys
+import tempfile
+from liferule import DEFAULT_RULE, parse_rule, rule_name, transitions
+from rletools import write_rle
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENGINE_VERSION = 1
+
+rule = DEFAULT_RULE
+birth, survival = parse_rule(rule)
+universe = set() # live cells of the current layer
+clipboard = ''
+
+def setrule(rulestring):
+    global rule, birth, survival
+    birth, survival = parse_rule(rulestring)
+    rule = rule_name(rulestring)
+
+def getrule():
+    return rule
+
+def parse(rle, x0=0, y0=0, A=1, B=0, C=0, D=1):
+    # decodes an RLE body (no "x = " header) into a cell list, like g.parse
+    cells = []
+    x = y = 0
+    count = ''
+    for ch in rle:
+        if ch.isdigit():
+            count += ch
+            continue
+        n = int(count) if count else 1
+        count = ''
+        if ch == '!':
+            break
+        elif ch == '$':
+            x = 0
+            y += n
+        elif ch in 'b.':
+            x += n
+        elif ch.isalpha():
+            for i in range(x, x + n):
+                cells.extend([x0 + A*i + B*y, y0 + C*i + D*y])
+            x += n
+        # whitespace and anything else is ignored
+    return cells
+
+def _to_set(cells):
+    return set(zip(cells[::2], cells[1::2]))
+
+def _to_list(cellset):
+    # Golly returns cells row by row, left to right
+    cells = []
+    for x, y in sorted(cellset, key=lambda c:(c[1], c[0])):
+        cells.extend([x, y])
+    return cells
+
+def _step_python(cellset, gens):
+    for gen in range(gens):
+        counts = {}
+        for x, y in cellset:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    if dx or dy:
+                        counts[(x+dx, y+dy)] = counts.get((x+dx, y+dy), 0) + 1
+        cellset = set(c for c, n in counts.items() if (n in survival if c in cellset else n in birth))
+        if not cellset:
+            break
+    return cellset
+
+def _step_numpy(cells, gens):
+    xs = np.array(cells[::2], dtype=np.int64)
+    ys = np.array(cells[1::2], dtype=np.int64)
+    left, top = xs.min() - 2, ys.min() - 2
+    board = np.zeros((ys.max() - top + 3, xs.max() - left + 3), dtype=np.uint8)
+    board[ys - top, xs - left] = 1
+    table = np.array(transitions(rule), dtype=np.uint8) # indexed by 9*alive + neighbours
+    nine = np.uint8(9)
+    for gen in range(gens):
+        # keep a two-cell margin of dead cells so the pattern can grow by one cell
+        if board[:2].any() or board[-2:].any() or board[:, :2].any() or board[:, -2:].any():
+            board = np.pad(board, 8)
+            left -= 8
+            top -= 8
+        n = np.zeros(board.shape, dtype=np.uint8)
+        n[1:-1, 1:-1] = (board[:-2, :-2] + board[:-2, 1:-1] + board[:-2, 2:] +
+                         board[1:-1, :-2] + board[1:-1, 2:] +
+                         board[2:, :-2] + board[2:, 1:-1] + board[2:, 2:])
+        board = np.take(table, board*nine + n)
+        if gen % 64 == 63: # trim so dead space doesn't slow things down
+            rows = np.flatnonzero(board.any(axis=1))
+            if not len(rows):
+                return []
+            cols = np.flatnonzero(board.any(axis=0))
+            board = board[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+            board = np.pad(board, 2)
+            left += cols[0] - 2
+            top += rows[0] - 2
+    ys, xs = np.nonzero(board) # row-major, which is already Golly's order
+    cells = np.empty(2*len(xs), dtype=np.int64)
+    cells[::2] = xs + left
+    cells[1::2] = ys + top
+    return cells.tolist()
+
+def evolve(cells, gens):
+    # returns the cell list after the given number of generations, like g.evolve
+    if not cells or gens <= 0:
+        return list(cells)
+    if np is not None:
+        return _step_numpy(cells, gens)
+    return _to_list(_step_python(_to_set(cells), gens))
+
+def _transform(cells, x0, y0, A, B, C, D):
+    return [(x0 + A*x + B*y, y0 + C*x + D*y) for x, y in zip(cells[::2], cells[1::2])]
+
+def new(title):
+    universe.clear()
+
+def empty():
+    return not universe
+
+def putcells(cells, x0=0, y0=0, A=1, B=0, C=0, D=1, mode='or'):
+    for c in _transform(cells, x0, y0, A, B, C, D):
+        if mode == 'xor' and c in universe:
+            universe.discard(c)
+        else:
+            universe.add(c)
+
+def getrect():
+    if not universe:
+        return []
+    xs = [c[0] for c in universe]
+    ys = [c[1] for c in universe]
+    return [min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1]
+
+def getcells(rect=[]):
+    if not rect:
+        return _to_list(universe)
+    x, y, w, h = rect
+    return _to_list(c for c in universe if x <= c[0] < x + w and y <= c[1] < y + h)
+
+def save(filename, format='rle', remember=False):
+    with builtins.open(filename, 'w') as f:
+        write_rle(f, sorted(universe, key=lambda c:(c[1], c[0])), rule)
+
+def open(filename, remember=False):
+    # loads an RLE file into the universe, like g.open
+    x0 = y0 = 0
+    body = ''
+    with builtins.open(filename) as f:
+        for line in f:
+            if line.startswith('#CXRLE') and 'Pos=' in line:
+                x0, y0 = (int(v) for v in line.split('Pos=')[1].split()[0].split(','))
+            elif line.startswith('x ') or line.startswith('x='):
+                if 'rule' in line:
+                    setrule(line.split('rule')[1].strip(' =\n'))
+            elif not line.startswith('#'):
+                body += line
+    new(filename)
+    putcells(parse(body, x0, y0))
+
+def getdir(which):
+    if which == 'temp':
+        return tempfile.gettempdir()
+    return os.getcwd()
+
+def opendialog(title='', filetypes='', initialdir='', initialfname='', mustexist=True):
+    # there's no dialog here; look for the file in the working directory and next to this script
+    name = os.path.basename(initialfname)
+    for folder in (initialdir, os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        if folder and name and os.path.exists(os.path.join(folder, name)):
+            return os.path.join(folder, name)
+    return ''
+
+def show(message):
+    sys.stderr.write('\r' + message[:150].ljust(79))
+    sys.stderr.flush()
+
+def warn(message, showCancel=True):
+    sys.stderr.write('\nWarning: ' + message + '\n')
+
+def note(message, showCancel=True):
+    sys.stderr.write('\n' + message + '\n')
+
+def exit(message=''):
+    raise SystemExit(message or None)
+
+def setclipstr(s):
+    global clipboard
+    clipboard = s
+
+def getclipstr():
+    return clipboard
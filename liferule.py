@@ -0,0 +1,38 @@
+# liferule.py
+# Outer-totalistic rules ("B3/S23", "B36/S23", "S23/B3", ...) for the engines,
+# so the same collection builder can run a sibling collection in another rule.
+#
+# A rule becomes a lookup table of 18 next states, indexed by
+# 9*alive + live neighbours; lifeengine.py applies it to a whole board with
+# one take(), batchlife.py turns it into bitwise operations on packed rows,
+# and hashlife.py builds its 4x4 -> 2x2 table from it.
+
+DEFAULT_RULE = 'B3/S23'
+
+def parse_rule(rulestring):
+    # returns the (birth, survival) neighbour counts of an outer-totalistic rule
+    parts = rulestring.strip().upper().split(':')[0].split('/')
+    if len(parts) != 2:
+        raise ValueError('Unsupported rule: ' + rulestring)
+    b, s = parts
+    if b.startswith('S'): # S23/B3 order
+        b, s = s, b
+    if not b.startswith('B') or not s.startswith('S') or not set(b[1:] + s[1:]) <= set('012345678'):
+        raise ValueError('Unsupported rule: ' + rulestring)
+    if '0' in b: # every empty cell of the unbounded universe would be born
+        raise ValueError('B0 rules are not supported: ' + rulestring)
+    return tuple(sorted(set(int(c) for c in b[1:]))), tuple(sorted(set(int(c) for c in s[1:])))
+
+def rule_name(rulestring):
+    # the usual way of writing a rule, e.g. "s23/b3" -> "B3/S23"
+    birth, survival = parse_rule(rulestring)
+    return 'B' + ''.join(map(str, birth)) + '/S' + ''.join(map(str, survival))
+
+def transitions(rulestring):
+    # next state of a cell, indexed by 9*alive + the number of live neighbours
+    birth, survival = parse_rule(rulestring)
+    return tuple(int(n in birth) for n in range(9)) + tuple(int(n in survival) for n in range(9))
+
+def is_life(rulestring):
+    # whether the rule is B3/S23, which the engines have a faster path for
+    return parse_rule(rulestring) == parse_rule(DEFAULT_RULE)
@@ -0,0 +1,64 @@
+# osccache.py
+# On-disk cache of pass-2 results, so a rebuild only simulates the entries of
+# oscillators.txt that are new or have changed.  Entries are keyed by a hash of
+# their RLE (header and body, ignoring whitespace); comments aren't part of the
+# key, so editing a name or a #C line doesn't force a re-run.
+#
+# The whole cache is thrown away if CACHE_VERSION, the engine, the rule or the
+# choice of phase (COMPACT_PHASE in b3s23osc.py) changes.
+# Bump CACHE_VERSION whenever run_pattern_in_golly's results change meaning.
+
+import hashlib
+import json
+import os
+try:
+    import golly as g
+except ImportError: # not running inside Golly; use the built-in engine instead
+    import lifeengine as g
+
+CACHE_VERSION = 4
+
+def engine_name():
+    if hasattr(g, 'ENGINE_VERSION'):
+        return 'lifeengine %s' % g.ENGINE_VERSION
+    return 'golly %s' % g.getversion()
+
+def entry_key(entry):
+    rle = ''.join(entry[entry.index('x ='):].split())
+    return hashlib.sha256(rle.encode()).hexdigest()
+
+def load_cache(path, compact=False):
+    # returns the saved cache, or an empty one if it's missing, unreadable or
+    # stale; compact is whether results keep the most compact phase
+    header = {'version': CACHE_VERSION, 'engine': engine_name(), 'rule': g.getrule(), 'compact': compact}
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+        if all(cache.get(k) == v for k, v in header.items()) and isinstance(cache.get('results'), dict):
+            return cache
+    except (OSError, ValueError):
+        pass
+    header['results'] = {}
+    return header
+
+def cache_lookup(cache, entry):
+    # returns the cached result tuple for an entry, or None if it hasn't been seen
+    try:
+        found = cache['results'].get(entry_key(entry))
+    except ValueError: # no "x =", so analyze_entry will complain about it
+        return None
+    if found is None:
+        return None
+    return (entry[:entry.index('x =')] + found[0],) + tuple(found[1:])
+
+def cache_store(cache, entry, result):
+    if result is None: # failures aren't cached, so their warnings show up on every build
+        return
+    comments = entry[:entry.index('x =')]
+    cache['results'][entry_key(entry)] = [result[0][len(comments):]] + list(result[1:])
+
+def save_cache(path, cache):
+    tempname = path + '.tmp'
+    with open(tempname, 'w') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(tempname, path) # so an interrupted build can't leave a half-written cache
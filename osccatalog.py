@@ -0,0 +1,123 @@
+# osccatalog.py
+# A SQLite catalog of the stamp collection, written alongside oscillators.rle,
+# so questions like "all p3 oscillators under 20x20 by DRH" are indexed queries
+# instead of text searches through the RLE comments.
+#
+# One row per oscillator: its label (period.row.number, as in the #N lines of
+# oscillators.rle), name, period, bounding box, population, discoverer and date
+# from the #O line, a hash that is the same for every phase, rotation and
+# reflection (see canonical.py), and where it sits in the stamp collection.
+# duplicate_of is the label of an earlier oscillator with the same hash.
+# Entries given a period with %N are checked with hashlife, which doesn't see
+# their other phases, so their hash only covers the stored phase: the same
+# object entered in another phase gets another hash.
+
+import os
+import re
+import sqlite3
+from liferule import DEFAULT_RULE
+from osclib import analyze_entry
+try:
+    import golly as g
+except ImportError: # not running inside Golly
+    import lifeengine as g
+
+SCHEMA = '''
+CREATE TABLE oscillators (
+    id INTEGER PRIMARY KEY,
+    label TEXT, name TEXT, period INTEGER, width INTEGER, height INTEGER, population INTEGER,
+    discoverer TEXT, date TEXT, year INTEGER, hash TEXT, duplicate_of TEXT, x INTEGER, y INTEGER, rle TEXT, comments TEXT);
+CREATE INDEX by_period ON oscillators (period, width, height);
+CREATE INDEX by_population ON oscillators (population);
+CREATE INDEX by_discoverer ON oscillators (discoverer COLLATE NOCASE);
+CREATE INDEX by_year ON oscillators (year);
+CREATE INDEX by_hash ON oscillators (hash);
+CREATE INDEX by_label ON oscillators (label);
+CREATE INDEX by_duplicate ON oscillators (duplicate_of);
+'''
+
+_MONTHS = 'Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+_DATE = re.compile(r'\b((?:\d{1,2}/){1,2}\d{2,4}|(?:%s)[a-z]* \d{4}|\d{4})\b' % _MONTHS)
+
+def parse_origin(line):
+    # Splits an #O line such as "DRH 4/23/93", "NB, Jan 2013" or "JHC group 1970"
+    # into (discoverer, date, year); the date and year are None if there isn't one.
+    found = _DATE.search(line)
+    if not found:
+        return line.strip(), None, None
+    year = int(found.group(1).split('/')[-1].split()[-1])
+    if year < 100: # two-digit years in this file run from the 1970s to the 2020s
+        year += 1900 if year >= 60 else 2000
+    return line[:found.start()].strip(' ,'), found.group(1), year
+
+def write_catalog(path, placements):
+    # placements is a list of (label, Oscillator, x, y) in stamp-collection order
+    tempname = path + '.tmp'
+    if os.path.exists(tempname):
+        os.remove(tempname)
+    db = sqlite3.connect(tempname)
+    db.executescript(SCHEMA)
+    rows = []
+    first = {} #hash -> label of the first oscillator with it
+    for label, osc, x, y in placements:
+        discoverer, when, year = parse_origin(osc.discoverer)
+        rows.append((label, osc.name, osc.period, osc.width, osc.height, osc.population,
+                     discoverer, when, year, osc.canonical, first.get(osc.canonical), x, y, osc.rle, osc.comments))
+        first.setdefault(osc.canonical, label)
+    db.executemany('INSERT INTO oscillators (label, name, period, width, height, population, discoverer, date, '
+                   'year, hash, duplicate_of, x, y, rle, comments) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)', rows)
+    db.commit()
+    db.close()
+    os.replace(tempname, path)
+
+def open_catalog(path):
+    if not os.path.exists(path):
+        raise OSError('No catalog at ' + path)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    return db
+
+def query(path, period=None, max_width=None, max_height=None, max_population=None, discoverer=None,
+          year=None, name=None, hash=None, limit=None):
+    # Returns the matching rows (sqlite3.Row, indexable by column name) in
+    # stamp-collection order.  name matches any part of the name, ignoring case.
+    where = []
+    args = []
+    for test, value in (('period = ?', period), ('width <= ?', max_width), ('height <= ?', max_height),
+                        ('population <= ?', max_population), ('discoverer = ? COLLATE NOCASE', discoverer),
+                        ('year = ?', year), ('name LIKE ?', name and '%' + name + '%'), ('hash = ?', hash)):
+        if value is not None:
+            where.append(test)
+            args.append(value)
+    sql = 'SELECT * FROM oscillators'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY id'
+    if limit is not None:
+        sql += ' LIMIT %d' % limit
+    db = open_catalog(path)
+    try:
+        return db.execute(sql, args).fetchall()
+    finally:
+        db.close()
+
+def duplicates(path):
+    # the oscillators that are another phase or orientation of an earlier one
+    db = open_catalog(path)
+    try:
+        return db.execute('SELECT * FROM oscillators WHERE duplicate_of IS NOT NULL ORDER BY id').fetchall()
+    finally:
+        db.close()
+
+def find_same(path, entry, rule=DEFAULT_RULE, warn=g.warn):
+    # Runs a new entry (an RLE in rule, with or without comments) and returns
+    # the oscillators in the catalog that are the same object in any phase or
+    # orientation.  Returns None if the entry isn't an oscillator.  Entries
+    # with %N, new or in the catalog, are only compared in their stored phase
+    # (see above), which warn is told about for a new one.
+    result = analyze_entry(entry, warn, rule=rule)
+    if result is None:
+        return None
+    if '%' in entry[entry.find('x ='):]:
+        warn('Only the phase given is compared for entries with %N; the same object in another phase isn\'t found')
+    return query(path, hash=result[6])
@@ -0,0 +1,84 @@
+# osccheckpoint.py
+# What each stage of the b3s23osc.py build leaves behind, so that a later stage
+# can be run again on its own (e.g. to try another ROW_WIDTH or labellookup
+# without simulating anything):
+#
+#   parse.json    the entries of oscillators.txt, as oscreader.Records
+#   analyze.json  every oscillator found, sorted by period and height
+#   layout.json   the columns, with each object given by its place in
+#                 analyze.json (or as a digit or block), and the number of periods
+#
+# A layout checkpoint names the analysis it was made from, so it isn't used
+# with a newer analyze.json.
+
+import json
+import os
+import time
+from oscreader import Record
+from osclib import Oscillator
+
+CHECKPOINT_VERSION = 1
+
+def checkpoint_path(folder, stage):
+    return os.path.join(folder, stage + '.json')
+
+def save_checkpoint(folder, stage, state):
+    # state is a dict of JSON-friendly values; returns the stamp it was saved with
+    os.makedirs(folder, exist_ok=True)
+    checkpoint = dict(state, version=CHECKPOINT_VERSION, stage=stage, stamp='%.6f' % time.time())
+    path = checkpoint_path(folder, stage)
+    tempname = path + '.tmp'
+    with open(tempname, 'w') as f:
+        f.write(json.dumps(checkpoint, separators=(',', ':'))) # much faster than json.dump, which can't use the C encoder
+    os.replace(tempname, path)
+    return checkpoint['stamp']
+
+def load_checkpoint(folder, stage):
+    # returns the saved state, or None if there's no usable checkpoint
+    try:
+        with open(checkpoint_path(folder, stage)) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('version') == CHECKPOINT_VERSION and checkpoint.get('stage') == stage:
+            return checkpoint
+    except (OSError, ValueError):
+        pass
+    return None
+
+def records_to_json(records):
+    return [list(r) for r in records]
+
+def records_from_json(rows):
+    return [Record(*r[:2] + [tuple(r[2])] + r[3:]) for r in rows]
+
+def oscillators_to_json(oscillators):
+    return [list(o) for o in oscillators]
+
+def oscillators_from_json(rows):
+    return [Oscillator(*o[:10] + [tuple((c[0], c[1]) for c in o[10]), o[11]]) for o in rows]
+
+def columns_to_json(columns, oscillators, digit_glyphs, block_glyph):
+    # each column as [width_change, [[x, y, number in row, row, object], ...]]
+    # in placing order, where object is an index into oscillators, a digit
+    # '0' to '9' or 'block'
+    refs = dict((id(o), n) for n, o in enumerate(oscillators))
+    refs.update((id(o), str(n)) for n, o in enumerate(digit_glyphs))
+    refs[id(block_glyph)] = 'block'
+    return [[width_change, [list(i) + [refs[id(osc)]] for i, osc in pattern_dict.items()]]
+            for pattern_dict, width_change in columns]
+
+def columns_from_json(rows, oscillators, digit_glyphs, block_glyph):
+    # the columns as layout() returns them, made of the very same objects, so
+    # that e.g. "osc is block_glyph" still works
+    columns = []
+    for width_change, placed in rows:
+        pattern_dict = {}
+        for x, y, number, row, ref in placed:
+            if ref == 'block':
+                osc = block_glyph
+            elif isinstance(ref, str):
+                osc = digit_glyphs[int(ref)]
+            else:
+                osc = oscillators[ref]
+            pattern_dict[x, y, number, row] = osc
+        columns.append((pattern_dict, width_change))
+    return columns
@@ -0,0 +1,244 @@
+# oscdiff.py
+# Compares two builds of the stamp collection and lists the oscillators that
+# were added, removed, moved or changed, by name and period.row.column, so a
+# rebuild can be checked without looking over the whole pattern for objects
+# that went missing.
+#
+# Each object gets a hash of its own cells, relative to its label point.
+# The live cells, less the period digits and separator blocks, are cut into
+# pieces, and each object's box is grown from its label point over the
+# pieces within RING of it (the layout leaves RING empty cells around every
+# object), so the pieces an object is made of are found without comparing
+# it with its neighbours; see Build._hashes.  The objects of the two builds
+# are matched up by period, name, discoverer and comments.  One whose hash
+# is the same in both builds is unchanged if its label is where it was and
+# moved if not, without cutting anything out.  Only the others are cut out
+# of both builds with oscextract.locate, using the cells near them, and
+# compared, so a rebuild that moves most of the collection takes hardly
+# longer than one that moves nothing.
+#
+# An object that locate can't cut out (see oscextract.py) is listed as
+# unresolved rather than changed, to be looked at by hand.
+#
+#   python oscdiff.py old.rle new.rle
+#
+# NumPy is required.
+
+import argparse
+import time
+from collections import namedtuple
+from oscextract import read_collection, read_entries, locate, normalized, reach, free_pieces, Pieces, LABEL_OFFSET, RING, _centred, _gaps
+from osclayout import labellookup
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Change = namedtuple('Change', 'kind old new name')
+# kind is 'added', 'removed', 'moved', 'changed' or 'unresolved' (its hash
+# changed, but oscextract.locate couldn't cut it out of one build or both,
+# so it may or may not have changed); old and new are the object's
+# label (period.row.column) in each build, or None
+
+class Build:
+    # one stamp collection: its cells sorted by x, the objects' entries,
+    # label points, zooms and reaches, and for each object a hash of its
+    # cells (None if they can't be told apart from the rest without locate)
+    def __init__(self, path):
+        comment_lines, cells, labels, rule = read_collection(path)
+        self.entries = read_entries(comment_lines)[:len(labels)]
+        self.points = [(x - LABEL_OFFSET, y) for x, y, zoom, text in labels[:len(self.entries)]]
+        self.zooms = [zoom for x, y, zoom, text in labels[:len(self.entries)]]
+        extent = (cells.min(axis=0).tolist() + cells.max(axis=0).tolist()) if len(cells) else [0, 0, 0, 0]
+        places = [tuple(int(n) for n in entry[0].split('.')) for entry in self.entries]
+        self.reach = reach(self.points, self.zooms, extent, places) + RING
+        self.cells = cells[np.argsort(cells[:, 0], kind='stable')]
+        self.x = self.cells[:, 0].astype(np.int64)
+        self.y = self.cells[:, 1].astype(np.int64)
+        self.hashes = self._hashes(cells, extent)
+
+    def _hashes(self, cells, extent):
+        # Each object's box holds the smallest box centred on its label point,
+        # as wide as the narrowest width for its zoom, and every piece of live
+        # cells within RING of that box, and of what that takes in, and so on
+        # (the layout leaves RING empty cells around every object; the period
+        # digits and separator blocks come closer, so those are left out).
+        # A piece that is in no such box belongs to the one object that can
+        # reach it, if there is just one, and is taken into that box.  One
+        # that several objects can reach may be part of any of them, so it
+        # goes into the hash of each.  The hash is the box's place and the
+        # wrapped sum of a mixed number for each of its pieces, from the
+        # piece's shape and its offset from the label point; it's None unless
+        # the box holds no other label and, if no pieces are shared with
+        # other objects, has a width its zoom is used for.
+        groups, boxes = free_pieces(cells, self.points) if len(cells) else ([], None)
+        if not groups:
+            return [None] * len(self.points)
+        left, top = extent[0] - RING, extent[1] - RING
+        order = np.concatenate(groups)
+        sizes = np.fromiter(map(len, groups), dtype=np.int64, count=len(groups))
+        starts = np.cumsum(sizes) - sizes
+        xs, ys = cells[order, 0].astype(np.int64) - left, cells[order, 1].astype(np.int64) - top
+        number = np.repeat(np.arange(1, len(groups) + 1), sizes)
+        pieces = np.zeros((len(groups) + 1, 4), dtype=np.int64) # piece 0 is empty space
+        pieces[1:] = boxes - [left, top, left, top]
+        shapes = np.zeros(len(pieces), dtype=np.uint64) # hash of each piece's cells, relative to its corner
+        shapes[1:] = np.add.reduceat(_mix(((ys - pieces[number, 1]) << 32) + (xs - pieces[number, 0])), starts)
+        image = np.zeros((extent[3] - top + RING + 1, extent[2] - left + RING + 1), dtype=np.int32)
+        image[ys, xs] = number
+        centres = np.array(self.points, dtype=np.int64).reshape(-1, 2) - [left, top]
+        def close(box, held, px, py):
+            # box taken over held and grown until no piece comes within RING of it
+            while len(held):
+                l, r = _centred(min(box[0], int(held[:, 0].min())), max(box[2], int(held[:, 2].max())), px)
+                t, b = _centred(min(box[1], int(held[:, 1].min())), max(box[3], int(held[:, 3].max())), py)
+                box = (int(l), int(t), int(r), int(b))
+                band = np.concatenate([image[t - RING:t, l - RING:r + RING + 1].ravel(),
+                                       image[b + 1:b + RING + 1, l - RING:r + RING + 1].ravel(),
+                                       image[t:b + 1, l - RING:l].ravel(),
+                                       image[t:b + 1, r + 1:r + RING + 1].ravel()])
+                held = pieces[np.unique(band[band > 0])]
+            return box
+        boxes = []
+        for k, zoom in enumerate(self.zooms):
+            px, py = (int(v) for v in centres[k])
+            width = labellookup.index(zoom) if zoom in labellookup else 0
+            box = (px - width // 2, py, px - width // 2 + width, py)
+            line = image[py - RING:py + RING + 1, box[0] - RING:box[2] + RING + 1]
+            boxes.append(close(box, pieces[np.unique(line[line > 0])], px, py))
+        claimed = np.zeros(len(pieces), dtype=bool)
+        claimed[0] = True
+        for l, t, r, b in boxes:
+            claimed[image[t:b + 1, l:r + 1]] = True
+        spare = np.flatnonzero(~claimed)
+        shared = [[] for k in boxes]
+        for start in range(0, len(spare), 1024): # a block of pieces at a time, to keep memory bounded
+            block = pieces[spare[start:start+1024]]
+            gaps_x = np.maximum(block[:, None, 0] - centres[None, :, 0], centres[None, :, 0] - block[:, None, 2])
+            gaps_y = np.maximum(block[:, None, 1] - centres[None, :, 1], centres[None, :, 1] - block[:, None, 3])
+            reaching = (gaps_x <= self.reach[None, :, 0]) & (gaps_y <= self.reach[None, :, 1])
+            for n in range(len(block)):
+                owners = np.flatnonzero(reaching[n]).tolist()
+                if len(owners) == 1:
+                    k = owners[0]
+                    boxes[k] = close(boxes[k], block[n:n+1], int(centres[k, 0]), int(centres[k, 1]))
+                else:
+                    for k in owners:
+                        shared[k].append(spare[start + n])
+        hashes = [None] * len(boxes)
+        owner, members = [], []
+        holds = np.zeros(len(boxes), dtype=np.int64)
+        for start in range(0, len(boxes), 1024):
+            block = np.array(boxes[start:start+1024], dtype=np.int64)
+            holds[start:start+1024] = (_gaps(block, centres) <= 0).sum(axis=1)
+        for k, (l, t, r, b) in enumerate(boxes):
+            zoom = self.zooms[k]
+            if holds[k] > 1 or (not shared[k] and zoom in labellookup and labellookup[min(r - l, len(labellookup) - 1)] != zoom):
+                continue
+            inside = np.unique(image[t:b + 1, l:r + 1])
+            held = np.concatenate([inside[inside > 0], shared[k]]).astype(np.int64)
+            owner.append(np.full(len(held), k))
+            members.append(held)
+            hashes[k] = (l - centres[k, 0], t - centres[k, 1], r - centres[k, 0], b - centres[k, 1])
+        if not members:
+            return hashes
+        owner, members = np.concatenate(owner), np.concatenate(members)
+        offsets = ((pieces[members, 1] - centres[owner, 1]) << 32) + (pieces[members, 0] - centres[owner, 0])
+        totals = np.zeros(len(boxes), dtype=np.uint64)
+        np.add.at(totals, owner, _mix(shapes[members] ^ offsets.astype(np.uint64)))
+        return [h if h is None else tuple(int(v) for v in h) + (int(totals[k]),) for k, h in enumerate(hashes)]
+
+    def near(self, k, scale=1):
+        # indices in cells of the cells within scale times label k's reach of its point
+        (px, py), (rx, ry) = self.points[k], scale * self.reach[k]
+        lo, hi = np.searchsorted(self.x, [px - rx, px + rx + 1])
+        return lo + np.flatnonzero((self.y[lo:hi] >= py - ry) & (self.y[lo:hi] <= py + ry))
+
+    def objects(self, wanted):
+        # {label number: (x, y, relative cells)} for the wanted labels that
+        # can be found, looking only at the cells near them (as far as the
+        # cells of the neighbours locate compares them with)
+        if not wanted:
+            return {}
+        near = self.cells[np.unique(np.concatenate([self.near(k, 3) for k in wanted]))]
+        if not len(near):
+            return {}
+        found = locate(Pieces(near, self.points, self.zooms), wanted)[0]
+        return dict((k, normalized(near[found[k]])) for k in found)
+
+def _mix(keys):
+    # a well-mixed 64-bit number for each int64 key (splitmix64's finalizer)
+    z = keys.astype(np.uint64) + np.uint64(0x9e3779b97f4a7c15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return z ^ (z >> np.uint64(31))
+
+def _pairs(old, new):
+    # matches the objects of two builds up by period, name, discoverer and
+    # comments; returns (pairs, removed, added) as label numbers.  Where
+    # several objects share those, ones with the same label or place are
+    # paired first, then the rest in order.
+    groups = {}
+    for side, build in enumerate((old, new)):
+        for k, entry in enumerate(build.entries):
+            groups.setdefault((entry[1], entry[2], entry[3], tuple(entry[4])), ([], []))[side].append(k)
+    pairs, removed, added = [], [], []
+    for olds, news in groups.values():
+        for same in (lambda a, b: old.entries[a][0] == new.entries[b][0] and old.points[a] == new.points[b],
+                     lambda a, b: old.points[a] == new.points[b],
+                     lambda a, b: True):
+            for a in list(olds):
+                for b in news:
+                    if same(a, b):
+                        pairs.append((a, b))
+                        olds.remove(a)
+                        news.remove(b)
+                        break
+        removed.extend(olds)
+        added.extend(news)
+    return pairs, removed, added
+
+def diff(old_path, new_path):
+    # Returns the Changes from the collection in old_path to the one in
+    # new_path, in the order of the new build (removed objects last).
+    old, new = Build(old_path), Build(new_path)
+    pairs, removed, added = _pairs(old, new)
+    same = [old.hashes[a] is not None and old.hashes[a] == new.hashes[b] for a, b in pairs]
+    check = [p for p, s in zip(pairs, same) if not s]
+    moved = [(a, b) for (a, b), s in zip(pairs, same) if s and
+             (old.points[a] != new.points[b] or old.entries[a][0] != new.entries[b][0])]
+    old_objects = old.objects([a for a, b in check])
+    new_objects = new.objects([b for a, b in check])
+    changes = [(b, Change('added', None, new.entries[b][0], new.entries[b][2])) for b in added]
+    changes.extend((b, Change('moved', old.entries[a][0], new.entries[b][0], new.entries[b][2])) for a, b in moved)
+    for a, b in check:
+        before, after = old_objects.get(a), new_objects.get(b)
+        if before is None or after is None:
+            kind = 'unresolved'
+        elif not np.array_equal(before[2], after[2]):
+            kind = 'changed'
+        elif before[:2] != after[:2] or old.entries[a][0] != new.entries[b][0]:
+            kind = 'moved'
+        else:
+            continue
+        changes.append((b, Change(kind, old.entries[a][0], new.entries[b][0], new.entries[b][2])))
+    changes.sort(key=lambda c: c[0])
+    return ([c for n, c in changes] +
+            [Change('removed', old.entries[a][0], None, old.entries[a][2]) for a in sorted(removed)])
+
+def main():
+    parser = argparse.ArgumentParser(description='List the oscillators added, removed, moved or changed between two builds of the stamp collection.')
+    parser.add_argument('old')
+    parser.add_argument('new', nargs='?', default='oscillators.rle')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    changes = diff(args.old, args.new)
+    for change in changes:
+        label = change.new if change.old is None else change.old if change.new is None or change.new == change.old else change.old + ' -> ' + change.new
+        print('%-10s %s %s' % (change.kind, label, change.name or '(no name)'))
+    counts = dict((kind, sum(c.kind == kind for c in changes)) for kind in ('added', 'removed', 'moved', 'changed', 'unresolved'))
+    print('%(added)s added, %(removed)s removed, %(moved)s moved, %(changed)s changed, %(unresolved)s unresolved' % counts +
+          ' (%.2f seconds)' % (time.perf_counter() - started))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,676 @@
+# oscextract.py
+# Reads a finished stamp collection (oscillators.rle, or a .gz of it) back into
+# its oscillators, without Golly and without running anything: each object's
+# label (period.row.column), name, discoverer, comments, position and RLE.
+#
+# The live cells are decoded in one go (rledecode.py) and split into
+# connected pieces with a vectorized union-find.  Pieces that make up a period
+# digit or a separator row of blocks are set aside.  The other cells are given
+# to the LifeViewer LABEL commands, which are written in the same order as the
+# "period.row.column" comments and placed at the centre of the box of each
+# object's stored phase (plus 4 cells in x), with a zoom that depends on its
+# width.  Each object is the cells in the one box that fits all that (see
+# locate).
+#
+# An object that can't be cut out for sure, because no box or more than one
+# fits, it comes too close to another one, or it leaves pieces near it that
+# belong to no object, is listed as a problem and left out rather than given
+# the wrong cells.
+#
+#   python oscextract.py [oscillators.rle] [--source oscillators.txt] [--output stamps.json]
+#
+# --source also checks every object against oscillators.txt, so a build can
+# be validated without Golly.  NumPy is required.
+
+import argparse
+import gzip
+import json
+import re
+from collections import namedtuple
+from liferule import DEFAULT_RULE, rule_name
+from osclayout import digit_rles, block, spacing, labellookup
+from osclib import split_entry
+from oscreader import read_records
+from rledecode import decode_rles
+from rletools import encode_rle
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RING = spacing(1) # the layout leaves at least this many empty cells around every object
+LABEL_OFFSET = 4 # labels are written this far right of the centre
+
+Stamp = namedtuple('Stamp', 'label period name discoverer comments x y cells rle')
+# label is "period.row.column", comments a list of the #C lines that follow the
+# name, x and y the top left of the object's live cells in the collection,
+# cells an (N, 2) array relative to that, and rle the header and body.
+
+_ENTRY = re.compile(r'#[NC] (\d+)\.(\d+)\.(\d+)(?: (.*))?$')
+_LABEL = re.compile(r'#C \[\[ LABEL (-?\d+) (-?\d+) (\d+) "(.*)" \]\]$', re.DOTALL)
+_RULE = re.compile(r'rule\s*=\s*([^\s,]+)', re.IGNORECASE)
+
+def read_collection(path):
+    # Returns (comment lines, cells, labels, rule): the lines before the RLE,
+    # the live cells as an (N, 2) int32 array in the collection's
+    # coordinates, the LABEL commands as (x, y, zoom, text), and the rule of
+    # the "x = " header (B3/S23 if it names none).
+    opener = gzip.open if path.endswith('.gz') else open
+    comments, body, labels, pending = [], [], [], []
+    left = top = 0
+    rule = DEFAULT_RULE
+    part = 'comments'
+    with opener(path, 'rt') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if part == 'comments':
+                if line.startswith('#CXRLE'):
+                    found = re.search(r'Pos=(-?\d+),(-?\d+)', line)
+                    if found:
+                        left, top = int(found.group(1)), int(found.group(2))
+                elif line.startswith('x ') or line.startswith('x='):
+                    found = _RULE.search(line)
+                    if found:
+                        rule = rule_name(found.group(1))
+                    part = 'body'
+                elif line:
+                    comments.append(line)
+            elif part == 'body':
+                body.append(line)
+                if '!' in line:
+                    part = 'labels'
+            elif pending or line.startswith('#C [[ LABEL '):
+                pending.append(line) # a label whose text has a line break carries on in the next line
+                found = _LABEL.match('\n'.join(pending))
+                if found:
+                    labels.append((int(found.group(1)), int(found.group(2)), int(found.group(3)), found.group(4)))
+                    pending = []
+    cells = decode_rles([''.join(body)])[0]
+    cells[:, 0] += left
+    cells[:, 1] += top
+    return comments, cells, labels, rule
+
+def read_entries(comment_lines):
+    # (label, period, name, discoverer, comments) for each "period.row.column"
+    # line of the comment block, in order
+    entries = []
+    for line in comment_lines:
+        found = _ENTRY.match(line)
+        if found:
+            text = (found.group(4) or '').strip()
+            discoverer = ''
+            start = text.rfind('[')
+            if text.endswith(']') and start >= 0 and (start == 0 or text[start-1] == ' '):
+                text, discoverer = text[:start].strip(), text[start+1:-1]
+            entries.append(['%s.%s.%s' % found.group(1, 2, 3), int(found.group(1)), text, discoverer, []])
+        elif entries and line.startswith('#C ') and '-----' not in line:
+            entries[-1][4].append(line[3:].strip())
+    return [tuple(e) for e in entries]
+
+def components(cells, reach=1):
+    # Joins cells at most reach apart (in max(dx,dy)) and returns, for each
+    # cell, the index of a cell standing for its component.  Neighbours are
+    # found by binary search on sorted y*width+x keys, then joined by hooking
+    # roots onto smaller roots and compressing paths until nothing changes.
+    x = cells[:, 0].astype(np.int64) - int(cells[:, 0].min())
+    y = cells[:, 1].astype(np.int64) - int(cells[:, 1].min())
+    width = int(x.max()) + 2*reach + 2 # so an offset of -reach never lands on the row above
+    keys = y * width + x
+    order = np.argsort(keys)
+    keys = keys[order]
+    first, second = [], []
+    for dy in range(reach + 1):
+        for dx in range(-reach, reach + 1):
+            if dy == 0 and dx <= 0:
+                continue
+            wanted = keys + dy * width + dx
+            found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+            hit = keys[found] == wanted
+            first.append(np.flatnonzero(hit))
+            second.append(found[hit])
+    a = np.concatenate(first)
+    b = np.concatenate(second)
+    parent = np.arange(len(keys))
+    while True:
+        pa, pb = parent[a], parent[b]
+        if (pa == pb).all():
+            break
+        np.minimum.at(parent, np.maximum(pa, pb), np.minimum(pa, pb))
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+    result = np.empty(len(keys), dtype=np.int64)
+    result[order] = order[parent]
+    return result
+
+def _groups(cells, roots):
+    # (groups, boxes) for the components found by components(): the cell
+    # indices of each, and an (n, 4) array of left, top, right, bottom
+    order = np.argsort(roots, kind='stable')
+    starts = np.flatnonzero(np.concatenate(([True], roots[order][1:] != roots[order][:-1])))
+    xs, ys = cells[order, 0].astype(np.int64), cells[order, 1].astype(np.int64)
+    boxes = np.stack([np.minimum.reduceat(xs, starts), np.minimum.reduceat(ys, starts),
+                      np.maximum.reduceat(xs, starts), np.maximum.reduceat(ys, starts)], axis=1)
+    return np.split(order, starts[1:]), boxes
+
+def _pieces(cells, largest=(8, 14), kinds=None):
+    # groups cells into 8-connected pieces; returns (pieces, boxes, shapes):
+    # the cell indices of each piece, an (n, 4) array of left, top, right,
+    # bottom, and each piece's cells relative to its top left, for pieces no
+    # bigger than largest (the size of a digit) and, if kinds is given, whose
+    # (cells, width, height) is one of kinds, or None
+    pieces, boxes = _groups(cells, components(cells))
+    widths, heights = boxes[:, 2] - boxes[:, 0] + 1, boxes[:, 3] - boxes[:, 1] + 1
+    small = (widths <= largest[0]) & (heights <= largest[1])
+    if kinds is not None:
+        sizes = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+        small &= np.isin((sizes * 256 + widths) * 256 + heights, [(n * 256 + w) * 256 + h for n, w, h in kinds])
+    shapes = [None] * len(pieces)
+    for n in np.flatnonzero(small).tolist():
+        shapes[n] = tuple(sorted(map(tuple, (cells[pieces[n]] - boxes[n, :2]).tolist())))
+    return pieces, boxes, shapes
+
+_glyph_cache = []
+
+def _glyphs():
+    # each digit and the block as a list of (dx, dy, shape) pieces, the first one topmost
+    if _glyph_cache:
+        return _glyph_cache
+    glyphs = _glyph_cache
+    for rle in digit_rles + [block]:
+        flat = []
+        for x, y in decode_rles([split_entry(rle)[1]])[0].tolist(): # osclayout keeps them as B3/S23 RLEs, whatever the collection's rule
+            flat.extend([x, y])
+        pairs = np.array(flat, dtype=np.int64).reshape(-1, 2)
+        pieces, boxes, shapes = _pieces(pairs)
+        parts = sorted((int(b[1]), int(b[0]), s) for b, s in zip(boxes, shapes))
+        glyphs.append([(x - parts[0][1], y - parts[0][0], s) for y, x, s in parts])
+    return glyphs
+
+def _glyph_kinds():
+    # the (cells, width, height) of the pieces of the digits and the block
+    return set((len(s), max(x for x, y in s) + 1, max(y for x, y in s) + 1) for glyph in _glyphs() for dx, dy, s in glyph)
+
+def free_pieces(cells, points):
+    # (pieces, boxes) as from _pieces, for the pieces of the cells (an (N, 2)
+    # array) that aren't part of a period digit or a separator block, given
+    # the label points
+    pieces, boxes, shapes = _pieces(cells, kinds=_glyph_kinds())
+    glyphs = _glyph_pieces(boxes, shapes, set(points))
+    keep = [n for n in range(len(pieces)) if n not in glyphs]
+    return [pieces[n] for n in keep], boxes[keep]
+
+def _glyph_pieces(boxes, shapes, points):
+    # indices of the pieces that form a period digit or a separator block
+    small = [n for n, s in enumerate(shapes) if s is not None]
+    at = dict(((int(boxes[n, 0]), int(boxes[n, 1]), shapes[n]), n) for n in small)
+    glyphs = _glyphs()
+    found = set()
+    for n in small:
+        x, y, shape = int(boxes[n, 0]), int(boxes[n, 1]), shapes[n]
+        for number, glyph in enumerate(glyphs):
+            if shape != glyph[0][2]:
+                continue
+            parts = [at.get((x + dx, y + dy, s)) for dx, dy, s in glyph]
+            if None in parts:
+                continue
+            if number == len(glyphs) - 1: # a block, which is only a separator if it's in a row of them
+                if (x + 1, y + 1) in points or ((x - 6, y, shape) not in at and (x + 6, y, shape) not in at):
+                    continue
+            found.update(parts)
+    return found
+
+def _rights(zoom, window):
+    # the widths less 1 that the layout labels with this zoom, up to the
+    # widest box that fits in a window of this size
+    widest = 2 * (window - RING)
+    if zoom not in labellookup: # labellookup was changed for this build
+        return list(range(widest + 1))
+    return [r for r in range(min(widest + 1, len(labellookup))) if labellookup[r] == zoom]
+
+def _fits(near, rights, window):
+    # The boxes that could be an object's stored phase, given the cells near
+    # its label point (relative to it, no further than window) and the
+    # possible widths less 1.  Each box is centred on the point as the layout
+    # centres labels, has live cells on all four edges, and has no other live
+    # cell within RING of it.  Returns an (n, 4) array of left, top, right,
+    # bottom, relative to the point.  Counts come from a summed-area table,
+    # so every width and height is tried at once.
+    size = 2 * window + 1
+    grid = np.zeros((size + 1, size + 1), dtype=np.int32)
+    grid[near[:, 1] + window + 1, near[:, 0] + window + 1] = 1
+    table = grid.cumsum(axis=0).cumsum(axis=1)
+    # only the widths and heights with live cells in both edge columns and rows
+    columns, rows = table[-1, 1:] > table[-1, :-1], table[1:, -1] > table[:-1, -1]
+    r = np.array(rights, dtype=np.int64)
+    r = r[columns[window - r // 2] & columns[window - r // 2 + r]][:, None]
+    b = np.arange(2 * (window - RING) + 1, dtype=np.int64)
+    b = b[rows[window - b // 2] & rows[window - b // 2 + b]][None, :]
+    left, top = -(r // 2) + window, -(b // 2) + window # as indices into grid less 1
+    right, bottom = left + r, top + b
+    def count(l, t, r, b):
+        return table[b + 1, r + 1] - table[t, r + 1] - table[b + 1, l] + table[t, l]
+    inside = count(left, top, right, bottom)
+    fits = (inside > 0) & (count(left - RING, top - RING, right + RING, bottom + RING) == inside)
+    fits &= (count(left, top, left, bottom) > 0) & (count(right, top, right, bottom) > 0)
+    fits &= (count(left, top, right, top) > 0) & (count(left, bottom, right, bottom) > 0)
+    n, m = np.nonzero(fits)
+    return np.stack([left[n, 0], top[0, m], right[n, 0], bottom[0, m]], axis=1) - window
+
+class _Cells:
+    # some of the cells, sorted by x so that those in a box can be found quickly
+    def __init__(self, cells, index):
+        self.index = index[np.argsort(cells[index, 0], kind='stable')]
+        self.x = cells[self.index, 0].astype(np.int64)
+        self.y = cells[self.index, 1].astype(np.int64)
+
+    def within(self, box):
+        # positions in index of the cells in box (left, top, right, bottom)
+        lo, hi = np.searchsorted(self.x, [box[0], box[2] + 1])
+        return lo + np.flatnonzero((self.y[lo:hi] >= box[1]) & (self.y[lo:hi] <= box[3]))
+
+def _area(boxes):
+    return (boxes[:, 2] - boxes[:, 0] + 1) * (boxes[:, 3] - boxes[:, 1] + 1)
+
+def _centred(low, high, middle):
+    # (left, right): the smallest span over low to high that the layout
+    # centres on middle, as (left+right)//2; works on arrays too
+    around = np.maximum(middle - low, high - middle)
+    return middle - around + (middle - low < around), middle + around
+
+def _gaps(boxes, points):
+    # (len(boxes), len(points)) array: how far each point is from each box, in max(dx,dy)
+    return np.maximum(np.maximum(boxes[:, None, 0] - points[None, :, 0], points[None, :, 0] - boxes[:, None, 2]),
+                      np.maximum(boxes[:, None, 1] - points[None, :, 1], points[None, :, 1] - boxes[:, None, 3]))
+
+def reach(points, zooms, extent, places=None):
+    # (len(points), 2) array: how far, in x and in y, the box of the object
+    # labelled at each point can reach from it.  Each box is centred on its
+    # point, at least as wide as the narrowest width for its zoom and at
+    # most as wide as the widest (the last zoom has no widest), and boxes
+    # are at least RING apart, so a box can't reach past another label
+    # whose narrowest box is above or below it.  With the last zoom, it
+    # can't reach past another label in its row either.  places, if given,
+    # is the (period, row, column) of each label; where those are all
+    # different, the layout puts the objects of a row side by side and the
+    # rows of a period one under another, so a box can't reach past the
+    # objects next to it in its row or the labels of the rows above and
+    # below it either.  Where nothing stops it, it can reach the edge of
+    # extent (left, top, right, bottom).
+    centres = np.array(points, dtype=np.int64).reshape(-1, 2)
+    narrowest = np.array([labellookup.index(z) if z in labellookup else 0 for z in zooms], dtype=np.int64)
+    lefts, rights = centres[:, 0] - narrowest // 2, centres[:, 0] - narrowest // 2 + narrowest
+    where = {}
+    rows = {}
+    if places is not None and len(set(places)) == len(places):
+        where = dict((place, k) for k, place in enumerate(places))
+        for k, place in enumerate(places):
+            rows.setdefault(place[:2], []).append(int(centres[k, 1]))
+    result = np.empty((len(centres), 2), dtype=np.int64)
+    for k, zoom in enumerate(zooms):
+        px, py = centres[k]
+        # a box reaches as far down as up, or one further, and as far right
+        # as left, or one further
+        left, up, right, down = px - extent[0], py - extent[1], extent[2] - px, extent[3] - py
+        if zoom not in labellookup: # labellookup was changed for this build
+            result[k] = min(right, left + 1), min(down, up + 1)
+            continue
+        dx, dy = centres[:, 0] - px, centres[:, 1] - py
+        over = (lefts <= rights[k] + RING) & (rights >= lefts[k] - RING)
+        if (over & (dy > 0)).any():
+            down = min(down, int(dy[over & (dy > 0)].min()) - RING - 1)
+        if (over & (dy < 0)).any():
+            up = min(up, -int(dy[over & (dy < 0)].max()) - RING - 1)
+        if labellookup[-1] == zoom:
+            if ((dy == 0) & (dx > 0)).any():
+                right = min(right, int(dx[(dy == 0) & (dx > 0)].min()) - RING - 1)
+            if ((dy == 0) & (dx < 0)).any():
+                left = min(left, -int(dx[(dy == 0) & (dx < 0)].max()) - RING - 1)
+        else:
+            widest = len(labellookup) - 1 - labellookup[::-1].index(zoom)
+            right, left = min(right, widest - widest // 2), min(left, widest - widest // 2)
+        if where:
+            period, row, column = places[k]
+            if (period, row, column - 1) in where:
+                left = min(left, px - int(rights[where[period, row, column - 1]]) - RING - 1)
+            if (period, row, column + 1) in where:
+                right = min(right, int(lefts[where[period, row, column + 1]]) - px - RING - 1)
+            if (period, row - 1) in rows:
+                up = min(up, py - max(rows[period, row - 1]) - RING - 1)
+            if (period, row + 1) in rows:
+                down = min(down, min(rows[period, row + 1]) - py - RING - 1)
+        result[k] = min(right, left + 1), min(down, up + 1)
+    return result
+
+class Pieces:
+    # The live cells of a stamp collection cut into pieces, with the period
+    # digits and separator blocks told apart, and for each label point the
+    # window (half the side of a square around it) that its object's cells
+    # are looked for in.
+    def __init__(self, cells, points, zooms):
+        self.cells, self.points, self.zooms = cells, points, zooms
+        self.pieces, self.boxes, self.shapes = _pieces(cells, kinds=_glyph_kinds())
+        self.glyphs = _glyph_pieces(self.boxes, self.shapes, set(points))
+        self.piece_of = np.empty(len(cells), dtype=np.int64)
+        self.piece_of[np.concatenate(self.pieces)] = np.repeat(np.arange(len(self.pieces)), [len(p) for p in self.pieces])
+        glyphs = np.fromiter(self.glyphs, dtype=np.int64, count=len(self.glyphs))
+        self.free = _Cells(cells, np.flatnonzero(~np.isin(self.piece_of, glyphs)))
+        self.every = _Cells(cells, np.arange(len(cells)))
+        self.centres = np.array(points, dtype=np.int64).reshape(-1, 2)
+        self.extent = (int(cells[:, 0].min()), int(cells[:, 1].min()), int(cells[:, 0].max()), int(cells[:, 1].max()))
+        self.windows = self._windows()
+        self.limit = 2 * int(self.windows.max()) if len(self.windows) else 0
+        self._fitted = {} # label number -> (window, boxes that fit)
+        self._widened = set() # the spare pieces widen has already been given
+
+    def _windows(self):
+        # An object's cells are looked for in a square around its label point
+        # that holds, with RING to spare, the widest box its label's zoom is
+        # used for (or the narrowest, for the last zoom, which has no widest)
+        # and the smallest box its cells are sure to fill.  fits and widen
+        # make a window bigger where that isn't enough, up to limit: twice the
+        # biggest window that any label starts with.
+        free = self.cells[self.free.index]
+        blob_of = components(free, RING) if len(free) else np.zeros(0, dtype=np.int64)
+        blobs = np.zeros((len(free), 4), dtype=np.int64)
+        if len(free):
+            groups, boxes = _groups(free, blob_of)
+            for group, box in zip(groups, boxes):
+                blobs[blob_of[group[0]]] = box
+        windows = []
+        by_zoom = {}
+        for r, z in enumerate(labellookup):
+            by_zoom.setdefault(z, []).append(r)
+        for k, zoom in enumerate(self.zooms):
+            widths = by_zoom.get(zoom, [0])
+            widest = widths[0] if widths[-1] == len(labellookup) - 1 else widths[-1]
+            box = self._sure_box(self.points[k], widths[0], blob_of, blobs)
+            px, py = self.points[k]
+            windows.append(max(widest - widest // 2, px - box[0], box[2] - px, py - box[1], box[3] - py) + RING)
+        return np.array(windows, dtype=np.int64)
+
+    def _sure_box(self, point, right, blob_of, blobs):
+        # The smallest box centred on point, at least right+1 wide, that holds
+        # every blob (cells less than RING apart) with a cell within RING of
+        # it.  Each blob lies in a single object's box, since the layout
+        # leaves RING empty cells around every object, so an object's box
+        # holds all of this box and its blobs.
+        px, py = point
+        left, top = px - right // 2, py
+        box = start = (left, top, left + right, top)
+        while True:
+            near = self.free.within((box[0] - RING, box[1] - RING, box[2] + RING, box[3] + RING))
+            if not len(near):
+                return box
+            held = blobs[blob_of[near]]
+            left, right = map(int, _centred(min(box[0], int(held[:, 0].min())), max(box[2], int(held[:, 2].max())), px))
+            top, bottom = map(int, _centred(min(box[1], int(held[:, 1].min())), max(box[3], int(held[:, 3].max())), py))
+            if (left, top, right, bottom) == box:
+                return box
+            if (_gaps(np.array([[left, top, right, bottom]]), self.centres) <= 0).sum() > 1:
+                return start # blobs run into another object, so they can't be told apart
+            box = (left, top, right, bottom)
+
+    def fits(self, k):
+        # The boxes that fit label k's object in its window and hold no other
+        # label.  If there are none, the window is doubled until there are
+        # some or it reaches the limit.
+        px, py = self.points[k]
+        while self._fitted.get(k, (None,))[0] != self.windows[k]:
+            window = int(self.windows[k])
+            near = self.free.within((px - window, py - window, px + window, py + window))
+            found = _fits(np.stack([self.free.x[near] - px, self.free.y[near] - py], axis=1),
+                          _rights(self.zooms[k], window), window) + [px, py, px, py]
+            held = ((self.centres[:, 0] >= found[:, None, 0]) & (self.centres[:, 0] <= found[:, None, 2]) &
+                    (self.centres[:, 1] >= found[:, None, 1]) & (self.centres[:, 1] <= found[:, None, 3]))
+            held[:, k] = False
+            self._fitted[k] = (window, found[~held.any(axis=1)])
+            if not len(self._fitted[k][1]) and window < self.limit:
+                self.windows[k] = min(2 * window, self.limit)
+        return self._fitted[k][1]
+
+    def widen(self, spare, nearest=16):
+        # Widens the windows of the labels whose objects could hold one of the
+        # spare pieces but don't reach it: of the nearest labels that would
+        # need a bigger window for it, those whose box centred on their point
+        # that takes in the piece holds no other label.  Each piece is only
+        # looked at once.  Returns whether any window changed.
+        cx, cy = self.centres[:, 0], self.centres[:, 1]
+        widened = False
+        spare = [n for n in spare.tolist() if n not in self._widened]
+        self._widened.update(spare)
+        for box in self.boxes[spare]:
+            left, right = _centred(np.minimum(cx, box[0]), np.maximum(cx, box[2]), cx)
+            top, bottom = _centred(np.minimum(cy, box[1]), np.maximum(cy, box[3]), cy)
+            needed = np.maximum(np.maximum(cx - left, right - cx), np.maximum(cy - top, bottom - cy)) + RING
+            short = np.flatnonzero((needed > self.windows) & (needed <= self.limit))
+            short = short[np.argsort(needed[short], kind='stable')[:nearest]]
+            boxes = np.stack([left[short], top[short], right[short], bottom[short]], axis=1)
+            short = short[(_gaps(boxes, self.centres) <= 0).sum(axis=1) == 1] # just its own label
+            if len(short):
+                self.windows[short] = needed[short]
+                widened = True
+        return widened
+
+def _touching(boxes, others, gap=RING):
+    # (len(boxes), len(others)) array: whether each box comes within gap of each other box
+    return ((boxes[:, None, 0] <= others[None, :, 2] + gap) & (boxes[:, None, 2] >= others[None, :, 0] - gap) &
+            (boxes[:, None, 1] <= others[None, :, 3] + gap) & (boxes[:, None, 3] >= others[None, :, 1] - gap))
+
+def locate(collection, wanted=None):
+    # Finds the objects labelled at the points of collection (a Pieces) for
+    # the labels numbered in wanted (all of them by default).  Returns (found,
+    # lost, doubtful, left_over): a dict from label number to the indices of
+    # its cells, the labels for which no box fits, (label number, reason) for
+    # the objects left out of found because they can't be cut out for sure,
+    # and how many pieces belong to no label (only counted if all are wanted).
+    #
+    # The layout puts each object's stored phase in a box that starts at its
+    # RLE origin, is centred on the label and has the width that the label's
+    # zoom was chosen for, and leaves at least RING empty cells around it.
+    # Every box that fits that and doesn't hold another label is tried.  A
+    # box can't come within RING of the smallest box that fits another label
+    # either (which holds some of that label's cells), so neighbouring rows,
+    # period bands and objects rule out the boxes that reach into them; of
+    # those left, the largest is the object if it holds all the others.
+    # Pieces that end up in no box widen the windows of the labels that could
+    # own them, and the boxes are tried again.
+    points, centres, windows = collection.points, collection.centres, collection.windows
+    free = collection.free
+    wanted = range(len(points)) if wanted is None else sorted(wanted)
+    while True:
+        scope = set(wanted) # and the labels whose boxes could meet theirs
+        for k in wanted:
+            scope.update(np.flatnonzero(np.abs(centres - centres[k]).max(axis=1) <= windows[k] + windows + RING).tolist())
+        found, lost, doubtful, chosen, claimed = _choose(collection, dict((k, collection.fits(k)) for k in sorted(scope)))
+        # only the pieces in the windows of the wanted labels matter
+        if len(wanted) < len(points):
+            spare = free.index[np.concatenate([free.within((points[k][0] - windows[k], points[k][1] - windows[k],
+                                                            points[k][0] + windows[k], points[k][1] + windows[k])) for k in wanted])]
+        else:
+            spare = free.index
+        spare = np.unique(collection.piece_of[spare[~claimed[spare]]])
+        if not collection.widen(spare):
+            break
+    # A piece outside every box belongs to the label nearest to it, whose
+    # object can't be trusted if it has a box, since that box left it out.
+    left_over = 0
+    for start in range(0, len(spare), 1024): # a block of pieces at a time, to keep memory bounded
+        gaps = _gaps(collection.boxes[spare[start:start+1024]], centres)
+        nearest = gaps.argmin(axis=1)
+        outside = gaps[np.arange(len(nearest)), nearest] > windows[nearest]
+        left_over += int(outside.sum())
+        doubtful.extend((k, 'leaves pieces near it unclaimed') for k in set(nearest[~outside].tolist()) if k in chosen)
+    wanted = set(wanted)
+    doubtful = sorted(set(d for d in doubtful if d[0] in wanted))
+    for k, why in doubtful:
+        found.pop(k, None)
+    found = dict((k, found[k]) for k in found if k in wanted)
+    if len(wanted) < len(points):
+        left_over = 0
+    return found, sorted(k for k in lost if k in wanted), doubtful, left_over
+
+def _choose(collection, fits):
+    # Picks a box for each label from the boxes that fit it; returns (found,
+    # lost, doubtful, chosen, claimed), with chosen the box of each label
+    # that has one and claimed whether each cell is in one of them.
+    free, every = collection.free, collection.every
+    changed = True
+    while changed:
+        changed = False
+        owners = [k for k in fits if len(fits[k])]
+        smallest = np.array([fits[k][np.argmin(_area(fits[k]))] for k in owners]).reshape(-1, 4)
+        for k in owners:
+            if len(fits[k]) > 1:
+                clash = _touching(fits[k], smallest)
+                clash[:, owners.index(k)] = False
+                keep = ~clash.any(axis=1)
+                if not keep.all():
+                    fits[k] = fits[k][keep]
+                    changed = True
+    lost, doubtful, chosen = [], [], {}
+    for k in fits:
+        if not len(fits[k]):
+            lost.append(k)
+            continue
+        box = fits[k][np.argmax(_area(fits[k]))]
+        if ((fits[k][:, :2] < box[:2]) | (fits[k][:, 2:] > box[2:])).any():
+            doubtful.append((k, 'fits more than one box'))
+        else:
+            chosen[k] = box
+    # Where the boxes of two objects touch, one of them has to be smaller: the
+    # one that can shrink to clear the other without leaving any of its
+    # cells outside every box.
+    changed = True
+    while changed:
+        changed = False
+        owners = sorted(chosen)
+        taken = np.array([chosen[k] for k in owners]).reshape(-1, 4)
+        touching = _touching(taken, taken)
+        np.fill_diagonal(touching, False)
+        for n, m in zip(*np.nonzero(np.triu(touching))):
+            shrink = []
+            for a, b in ((owners[n], owners[m]), (owners[m], owners[n])):
+                clear = fits[a][~_touching(fits[a], chosen[b][None])[:, 0]]
+                if not len(clear):
+                    continue
+                box = clear[np.argmax(_area(clear))]
+                cells_left = free.within(chosen[a])
+                x, y = free.x[cells_left], free.y[cells_left]
+                out = ~((x >= box[0]) & (x <= box[2]) & (y >= box[1]) & (y <= box[3]))
+                others = np.delete(taken, owners.index(a), axis=0)
+                held = ((x[out, None] >= others[:, 0]) & (x[out, None] <= others[:, 2]) &
+                        (y[out, None] >= others[:, 1]) & (y[out, None] <= others[:, 3])).any(axis=1)
+                if held.all():
+                    shrink.append((a, box))
+            if len(shrink) == 1:
+                chosen[shrink[0][0]] = shrink[0][1]
+                changed = True
+                break
+    for n in np.flatnonzero(touching.any(axis=1)).tolist():
+        doubtful.append((owners[n], 'is too close to another object'))
+    # The object is every cell in its box, including any that look like
+    # blocks of a separator row, but never part of a period number.
+    block_shape = _glyphs()[-1][0][2]
+    digits = np.zeros(len(collection.pieces), dtype=bool)
+    digits[[n for n in collection.glyphs if collection.shapes[n] != block_shape]] = True
+    claimed = np.zeros(len(collection.cells), dtype=bool)
+    found = {}
+    for k in owners:
+        own = every.index[every.within(chosen[k])]
+        if digits[collection.piece_of[own]].any():
+            doubtful.append((k, 'takes in part of a period number'))
+        claimed[own] = True
+        found[k] = own
+    return found, lost, doubtful, chosen, claimed
+
+def normalized(own):
+    # (x, y, cells): the top left of an (N, 2) array of cells, and the cells
+    # relative to it, row by row
+    x, y = int(own[:, 0].min()), int(own[:, 1].min())
+    own = own - np.array([x, y], dtype=own.dtype)
+    return x, y, own[np.lexsort((own[:, 0], own[:, 1]))]
+
+def extract(path):
+    # Returns (stamps, problems, rule) for the stamp collection in path;
+    # problems lists anything that couldn't be matched up, and rule is the
+    # one the collection's header names.
+    comment_lines, cells, labels, rule = read_collection(path)
+    entries = read_entries(comment_lines)
+    problems = []
+    if len(entries) != len(labels):
+        problems.append('%s period.row.column comments but %s labels' % (len(entries), len(labels)))
+    points = [(x - LABEL_OFFSET, y) for x, y, zoom, text in labels]
+    found, lost, doubtful, left_over = locate(Pieces(cells, points, [l[2] for l in labels]))
+    def name(k):
+        return entries[k][0] if k < len(entries) else '#%s' % (k+1)
+    problems.extend('no object found for label %s at %s,%s' % (name(k), labels[k][0], labels[k][1]) for k in lost)
+    problems.extend('the object of label %s %s, so it is left out' % (name(k), why) for k, why in doubtful)
+    if left_over:
+        problems.append('%s pieces of live cells belong to no label' % left_over)
+    stamps = []
+    for k, entry in enumerate(entries[:len(points)]):
+        if k not in found:
+            continue
+        x, y, own = normalized(cells[found[k]])
+        stamps.append(Stamp(entry[0], entry[1], entry[2], entry[3], entry[4], x, y, own, encode_rle(own.ravel().tolist(), rule)))
+    return stamps, problems, rule
+
+def _shown_name(record):
+    # The name the build puts on an entry's label line: the first #N line,
+    # or for an entry without one, a first line that isn't #O or #C (e.g.
+    # "#DJB#113 9/7/81"), which takes the name's place.
+    lines = record.text.split('\n')
+    for line in lines:
+        if line.startswith('#N'):
+            return line[2:].strip()
+    if lines[0].startswith('#') and not lines[0].startswith(('#O', '#C')):
+        return lines[0].strip()
+    return ''
+
+def check(stamps, source, rule=DEFAULT_RULE):
+    # Compares the extracted objects with the entries of oscillators.txt in
+    # rule (the others aren't in the collection).
+    # Returns a list of problems: objects whose cells aren't any entry's (or
+    # that appear more often than in it), entries missing from the collection
+    # (which includes any the build rejected, e.g. non-oscillators), and
+    # objects whose name differs.
+    records = [r for r in read_records(source) if split_entry(r.text, rule) is not None]
+    decoded, offsets = decode_rles([r.rle for r in records])[:2]
+    by_rle = {}
+    for n, record in enumerate(records):
+        by_rle.setdefault(encode_rle(decoded[offsets[n]:offsets[n+1]].ravel().tolist(), rule), []).append(record)
+    problems = []
+    for stamp in stamps:
+        matches = by_rle.get(stamp.rle)
+        if not matches:
+            problems.append('%s %s is not in %s (or appears more than once)' % (stamp.label, stamp.name or '(no name)', source))
+            continue
+        same = [r for r in matches if _shown_name(r) == stamp.name]
+        if not same:
+            problems.append('%s is named %r in the collection but %r in %s' % (stamp.label, stamp.name, _shown_name(matches[0]), source))
+        matches.remove((same or matches)[0])
+    for matches in by_rle.values():
+        problems.extend('%s is not in the collection' % (r.name or 'an entry at byte %s' % r.offset) for r in matches)
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='List the oscillators of a stamp collection.')
+    parser.add_argument('collection', nargs='?', default='oscillators.rle')
+    parser.add_argument('--source', help='check the objects against this oscillators.txt')
+    parser.add_argument('--output', help='save the objects here as JSON')
+    args = parser.parse_args()
+    stamps, problems, rule = extract(args.collection)
+    if args.source:
+        problems.extend(check(stamps, args.source, rule))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([dict((k, v) for k, v in s._asdict().items() if k != 'cells') for s in stamps], f, indent=1)
+    print('%s oscillators in %s' % (len(stamps), args.collection))
+    for problem in problems:
+        print(problem)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# osclayout.py
+# Places the oscillators of the stamp collection, with the period digits and
+# the rows of blocks that separate periods, into columns.
+#
+# The oscillators are grouped by period once and every object is placed in a
+# single pass; rows are spread out to the full width, and columns to the full
+# height, arithmetically rather than by repeated shifting.  An object wider
+# than row_width gets a row of its own (the column is widened to fit it), a
+# period too tall for one column carries on in the next, and an object taller
+# than col_height gets a column of its own, instead of sending the layout into
+# an endless loop.
+
+from itertools import groupby
+
+#these create the digits for labeling periods
+zero = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$o5bo$bo5bo$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
+one = 'x = 8, y = 14, rule = B3/S23\n6b2o$7bo$6bo$6b2o2$6b2o$7bo$6bo$6b2o2$6b2o$7bo$6bo$6b2o!'
+two = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o$2o$o$bo$2o$2b2obo$2bob2o!'
+three = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o!'
+four = 'x = 8, y = 14, rule = B3/S23\n2o4b2o$bo5bo$o5bo$2o4b2o$2bob2o$2b2obo$6b2o$7bo$6bo$6b2o3$6b2o$6b2o!'
+five = 'x = 8, y = 14, rule = B3/S23\n2bob2o$2b2obo$2o$bo$o$2o$2bob2o$2b2obo$6b2o$7bo$6bo$6b2o$2bob2o$2b2obo!'
+six = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o$o$bo$2o$2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
+seven = 'x = 8, y = 14, rule = B3/S23\n2bob2o$2b2obo$6b2o$7bo$6bo$6b2o$4b2o$5bo$4bo$4b2o$2b2o$3bo$2bo$2b2o!'
+eight = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o!'
+nine = 'x = 8, y = 14, rule = B3/S23\n2b2obo$2bob2o$2o4b2o$o5bo$bo5bo$2o4b2o$2b2obo$2bob2o$6b2o$6bo$7bo$6b2o$2b2obo$2bob2o!'
+block = 'x = 2, y = 2, rule = B3/S23\n2o$2o!'
+
+digit_rles = [zero,one,two,three,four,five,six,seven,eight,nine]
+
+# These are the zoom levels set for labels on objects with different widths
+# E.g., for objects of width 1 to width 5, the zoom level is set to 50
+# (because for small objects there's not a lot of room for a label)
+labellookup = [20]*5 + [15]*5 + [14]*5 + [13]*5 + [12]*5 + [11]*5 + [10]*5 + [9]*5 + [8]*5 + [7]*5 + [6]*5 + [5]*1000  # last number just allows for increases to ROW_WIDTH
+
+def spacing(period): #both for horizontal and vertical spacing
+    if period == 1:
+        return 3
+    elif period in (2, 3):
+        return 4
+    elif 4 <= period <= 9:
+        return 5
+    else:
+        return 7
+
+def digit_width(num):
+    num = str(num)
+    return 10*len(num) - 6*(num[0] == '1')
+
+def _spread_row(pattern_list, x, limit):
+    # moves the nth object of a row n cells right as many times as it fits,
+    # so the row fills the full width; returns the new x
+    if not pattern_list or x > limit:
+        return x
+    k = (limit - x) // len(pattern_list)
+    for i in pattern_list:
+        i[1] += i[2] * k
+    return x + k * len(pattern_list)
+
+def _spread_column(pattern_dict, period_y, col_height):
+    # Drops everything at or below period_y (the period that didn't fit, which
+    # is placed again in the next column), then moves row r down r cells as
+    # many times as the column height allows.  Keys are (x, y, number in row, row).
+    pattern_dict = dict((i, pattern_dict[i]) for i in pattern_dict if i[1] < period_y)
+    rows = max(i[3] for i in pattern_dict)
+    shift = 0
+    if max(i[1] for i in pattern_dict) >= 30 and rows: #a single line isn't spread out
+        if max(i[1]+pattern_dict[i].height+rows for i in pattern_dict) <= col_height:
+            shift = min((col_height - rows - i[1] - pattern_dict[i].height) // i[3] for i in pattern_dict if i[3]) + 1
+    return dict(((i[0], i[1]+i[3]*shift, i[2], i[3]), pattern_dict[i]) for i in pattern_dict)
+
+def layout(oscillators, digit_glyphs, block_glyph, row_width=150, col_height=1300, progress=None):
+    # Returns a list of (pattern_dict, width_change), one per column.  pattern_dict
+    # maps (x, y, number in row, row) to the object placed there, in placing order;
+    # digits and blocks have number -1.  width_change is how far the column
+    # has to move right to leave room for the widest period number in it.
+    # oscillators must be sorted by period, then height.  progress(period) is
+    # called as each period is finished.
+    groups = [(period, list(members)) for period, members in groupby(oscillators, lambda a:a.period)]
+    if not groups:
+        return []
+    max_period = groups[-1][0]
+    columns = []
+    column_x = 0 #column x offset
+    period_y = 0 #y value at the beginning of the period
+    y = 0
+    pattern_dict = {}
+    pattern_list = [] #pattern_list empties into pattern_dict at the end of each row, column, and period
+    starting_digit_width = 4 #digit_width(1)
+    overflow = 0 #how far objects wider than row_width stick out of this column
+    rows = 0
+    current = 0 #index into groups
+    while current < len(groups):
+        period, period_patterns = groups[current]
+        x = column_x
+        if y < period_y + 20 - spacing(period) and y > 0:
+            y = period_y + 20 - spacing(period) #so displayed digits don't conflict
+        elif y > 0:
+            y += 7 - spacing(period)
+        period_y = y #becomes the y value at the beginning of the period
+        period_str = str(period)
+        for digit in range(len(period_str)): #creates displayed digits
+            pattern_dict[-10*(len(period_str)-digit)+column_x, y, -1, rows] = digit_glyphs[int(period_str[digit])]
+        if y > 0:
+            for i in range(-digit_width(period),row_width-6,6):
+                pattern_dict[i+column_x, y-4, -1, rows] = block_glyph
+        period_patterns = list(period_patterns)
+        if period == 1: #still lifes are sorted by size up to 10 bits
+            period_patterns.sort(key=lambda a:min(11,a.population))
+        if period == 2: #p2 oscillators are sorted by size up to 14 bits
+            period_patterns.sort(key=lambda a:min(15,a.population))
+        if row_width <= sum((i.width + spacing(period)) for i in period_patterns) - spacing(period) < row_width + digit_width(period):
+            y += 16 #moves the patterns down a line if they all fit on one line if moved down
+            x = column_x - digit_width(period)
+        new_column = False
+        for pattern in period_patterns:
+            if y + pattern.height >= col_height and period_y > 0: #end of column
+                new_column = True
+                break
+            if y + pattern.height >= col_height and (pattern_list or rows):
+                # a period that started at the top of this column won't fit in the next one
+                # either, so it carries on there, under another copy of its number
+                x = _spread_row(pattern_list, x, row_width + column_x)
+                for i in pattern_list:
+                    pattern_dict[(i[1], y+i[0].y_offset, i[2], rows)] = i[0]
+                columns.append((_spread_column(pattern_dict, col_height + 100, col_height), digit_width(period)-starting_digit_width))
+                column_x += row_width + 3 + digit_width(period) + (digit_width(period)-starting_digit_width) + overflow
+                starting_digit_width = digit_width(period)
+                x = column_x
+                y = 0
+                rows = 0
+                pattern_list = []
+                pattern_dict = {}
+                overflow = 0
+                for digit in range(len(period_str)):
+                    pattern_dict[-10*(len(period_str)-digit)+column_x, y, -1, rows] = digit_glyphs[int(period_str[digit])]
+            if x + pattern.width >= row_width + column_x and pattern_list: #end of row
+                x = _spread_row(pattern_list, x, row_width + column_x)
+                for i in pattern_list:
+                    pattern_dict[(i[1], y+i[0].y_offset, i[2], rows)] = i[0] #puts the list into a dict
+                rows += 1
+                y += max(i[0].height for i in pattern_list) + spacing(period) #maximum height
+                x = column_x - digit_width(period) * (y - 16 >= period_y) #moves left if the digit doesn't interfere
+                pattern_list = []
+            pattern_list.append([pattern, x+pattern.x_offset, len(pattern_list)])
+            x += pattern.width + spacing(period)
+            overflow = max(overflow, x - spacing(period) - row_width - column_x)
+        if y + period_patterns[-1].height >= col_height and period_y > 0:
+            new_column = True #prevents the last pattern going past the height limit
+        if new_column: #beginning of new column; the same period is placed again
+            columns.append((_spread_column(pattern_dict, period_y, col_height), digit_width(period)-starting_digit_width))
+            column_x += row_width + 3 + digit_width(period) + (digit_width(period)-starting_digit_width) + overflow
+            starting_digit_width = digit_width(period)
+            period_y = 0
+            y = 0
+            rows = 0
+            pattern_list = []
+            pattern_dict = {}
+            overflow = 0
+            continue
+        if progress:
+            progress(period)
+        current += 1
+        x = _spread_row(pattern_list, x, row_width + column_x) #these lines are the same as the end-of-row lines
+        for i in pattern_list:
+            pattern_dict[(i[1], y+i[0].y_offset, i[2], rows)] = i[0]
+        rows += 1
+        y += pattern_list[-1][0].height + spacing(period)
+        pattern_list = []
+    columns.append((_spread_column(pattern_dict, col_height + 100, col_height), digit_width(max_period)-starting_digit_width))
+    return columns
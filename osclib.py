@@ -0,0 +1,343 @@
+# osclib.py
+# Pattern analysis used by b3s23osc.py, kept in its own module so that worker
+# processes can import it without running the whole stamp-collection build.
+
+import multiprocessing
+import re
+import time
+from collections import namedtuple
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import batchlife
+import hashlife
+import rledecode
+from canonical import LowestPhases, canonical_hash
+from liferule import DEFAULT_RULE, rule_name
+from rletools import encode_rle
+try:
+    import golly as g
+except ImportError: # not running inside Golly; use the built-in engine instead
+    import lifeengine as g
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_RULE_FIELD = re.compile(r'rule\s*=\s*([^\s,]+)', re.IGNORECASE) # the rule field of an RLE header line
+
+def _timed(stats, key, function, *args):
+    # calls function, adding the time it took to stats[key] if stats isn't None
+    if stats is None:
+        return function(*args)
+    started = time.perf_counter()
+    result = function(*args)
+    stats[key] = stats.get(key, 0) + time.perf_counter() - started
+    return result
+
+def _note_peaks(stats, pattern):
+    # records the largest population and bounding box seen so far
+    xs = pattern[::2]
+    stats['peak_population'] = max(stats['peak_population'], len(xs))
+    stats['peak_width'] = max(stats['peak_width'], max(xs) - min(xs) + 1)
+    stats['peak_height'] = max(stats['peak_height'], pattern[-1] - pattern[1] + 1)
+
+def run_pattern_in_golly(pattern, comments, extended, warn=g.warn, stats=None, compact=False, rule=DEFAULT_RULE):
+    # The pattern is run in rule, which is also the rule written in the
+    # result; Golly's rule is set to it for the run and put back afterwards.
+    # stats, if given, is a dict that gets the number of generations run, the
+    # peak population and bounding box, and which path was taken.  If compact
+    # is set, the phase with the smallest bounding box (then population) is
+    # returned instead of the one given; only the best so far is kept.  Long
+    # periods checked with hashlife always keep the given phase.
+    previous = g.getrule()
+    if previous != rule:
+        g.setrule(rule)
+    try:
+        return _run_pattern(pattern, comments, extended, warn, stats, compact, rule)
+    finally:
+        if previous != rule:
+            g.setrule(previous)
+
+def _run_pattern(pattern, comments, extended, warn, stats, compact, rule):
+    if extended:
+        try:
+            extended = int(pattern[pattern.index('%')+1:])
+        except ValueError: #sometimes there's a % sign in the comments
+            extended = False
+    pattern_rle = pattern
+    pattern = g.parse(pattern)
+    if stats is not None:
+        stats.update(source='hashlife' if extended else 'step', extended=bool(extended), gens=0,
+                     peak_population=0, peak_width=0, peak_height=0)
+        if pattern:
+            _note_peaks(stats, pattern)
+    if len(pattern) % 2 == 1: #multistate rule for some reason
+        warn(pattern_rle)
+        warn(str(pattern))
+    initial_pattern = pattern.copy()
+    min_x = 0
+    max_x = max(islice(pattern, 0, None, 2))
+    min_y = 0
+    max_y = pattern[-1]
+    min_min_x = min_x #these four are the permanent minima and maxima, used for determining maximum pattern size
+    max_max_x = max_x
+    min_min_y = min_y
+    max_max_y = max_y
+    if extended: #long periods are checked with hashlife rather than one generation at a time
+        period, box = hashlife.verify_period(pattern, extended, rule)
+        if stats is not None: #hashlife doesn't see single generations, so there's only the box over the whole period
+            stats.update(gens=extended, peak_population=None)
+            if box:
+                stats.update(peak_width=box[2]-box[0]+1, peak_height=box[3]-box[1]+1)
+        if period is None:
+            warn('Not an oscillator, doesn\'t repeat after %s generations: %s' % (extended, initial_pattern))
+            return
+        if period != extended:
+            warn('Period %s is not minimal, pattern repeats after %s generations: %s' % (extended, period, initial_pattern))
+        min_min_x = min(min_min_x, box[0])
+        max_max_x = max(max_max_x, box[2])
+        min_min_y = min(min_min_y, box[1])
+        max_max_y = max(max_max_y, box[3])
+        #the other phases aren't seen, so the canonical hash only covers this one
+        return (comments + _timed(stats, 'grid_to_rle', convert_grid_to_rle, pattern, rule), period, max_max_x-min_min_x+1, max_max_y-min_min_y+1, -min_min_x, -min_min_y,
+                canonical_hash([list(zip(pattern[::2], pattern[1::2]))]))
+    initial_state = hash(tuple(pattern))
+    seen = {initial_state: 0} #state hash -> generation, to catch patterns that settle into some other cycle
+    lowest = LowestPhases() #for the canonical hash
+    lowest.add(len(pattern)//2, list(zip(pattern[::2], pattern[1::2])))
+    best = None #the most compact phase, if it isn't this one
+    best_key = ((max_x-min(islice(pattern, 0, None, 2))+1)*(pattern[-1]-pattern[1]+1), len(pattern))
+    for period in range(1, 1000): #maximum oscillator period
+        pattern = g.evolve(pattern,1)
+        if stats is not None:
+            stats['gens'] = period
+            if pattern:
+                _note_peaks(stats, pattern)
+        if not pattern:
+            warn('Not an oscillator, dies out completely: %s' % initial_pattern)
+            return
+        min_min_x = min(min_min_x, min(islice(pattern, 0, None, 2))) #sets new absolute minima and maxima
+        max_max_x = max(max_max_x, max(islice(pattern, 0, None, 2)))
+        min_min_y = min(min_min_y, pattern[1]) #cell lists are in row order, so the first and last cells have the extreme y values
+        max_max_y = max(max_max_y, pattern[-1])
+        state = hash(tuple(pattern))
+        if state == initial_state and pattern == initial_pattern: #only compare whole lists when the hashes match
+            if best:
+                left = min(islice(best, 0, None, 2))
+                return (comments + _timed(stats, 'grid_to_rle', convert_grid_to_rle, best, rule), period, max_max_x-min_min_x+1, max_max_y-min_min_y+1, left-min_min_x, best[1]-min_min_y,
+                        canonical_hash(lowest.phases))
+            return (comments + _timed(stats, 'grid_to_rle', convert_grid_to_rle, pattern, rule), period, max_max_x-min_min_x+1, max_max_y-min_min_y+1, -min_min_x, -min_min_y,
+                    canonical_hash(lowest.phases))
+            #0: RLE. 1: period. 2, 3: maximum bounding box for x and y. 4, 5: Greatest negative for calculating offset.
+            #6: hash that's the same for every phase, rotation and reflection.
+        if seen.get(state) and pattern == g.evolve(initial_pattern, seen[state]):
+            warn('Not an oscillator, settles into a period %s cycle after %s generations: %s' % (period - seen[state], seen[state], initial_pattern))
+            return
+        seen[state] = period
+        if compact:
+            key = ((max(islice(pattern, 0, None, 2))-min(islice(pattern, 0, None, 2))+1)*(pattern[-1]-pattern[1]+1), len(pattern))
+            if key < best_key:
+                best_key, best = key, pattern
+        if lowest.wants(len(pattern)//2):
+            lowest.add(len(pattern)//2, list(zip(pattern[::2], pattern[1::2])))
+    warn('Not an oscillator, maximum generations reached: %s' % initial_pattern)
+    return
+
+def convert_grid_to_rle(grid1, rule=DEFAULT_RULE):
+    if type(grid1) != list: #dict of cells, with 1 for on and 0 for off
+        grid1 = [coordinate for cell in grid1 if grid1[cell] == 1 for coordinate in cell]
+    return encode_rle(grid1, rule)
+
+def _header(rle, rule):
+    # (start of the header line, start of the body) if the RLE's header line
+    # has a rule field naming rule, however it's written; None otherwise
+    start = rle.find('x =')
+    if start < 0:
+        return None
+    end = rle.find('\n', start)
+    end = len(rle) if end < 0 else end + 1
+    found = _RULE_FIELD.search(rle, start, end)
+    try:
+        if found and rule_name(found.group(1)) == rule_name(rule):
+            return start, end
+    except ValueError: #not an outer-totalistic rule, so not this one
+        pass
+    return None
+
+def split_entry(entry, rule=DEFAULT_RULE):
+    # (comments, body) of an entry whose RLE header is for rule, with the
+    # body starting on the line after the header; None for any other rule
+    found = _header(entry, rule)
+    if found is None:
+        return None
+    return entry[:found[0]], entry[found[1]:]
+
+def convert_rle_to_grid(rle, rule=DEFAULT_RULE):
+    found = _header(rle, rule)
+    if found is None:
+        g.show('"rule = %s not in RLE": ' % rule + rle)
+        return {}
+    comments = rle[:found[0]]
+    rle = rle[found[1]:] #starts after the dimension and rule identifiers
+    rle_decoded = g.parse(rle)
+    pattern = list(zip(rle_decoded[::2], rle_decoded[1::2])) #live cells only; the bounding box starts at (0,0)
+    return (pattern, comments)
+
+class Oscillator(namedtuple('Oscillator', 'rle period width height x_offset y_offset population name discoverer comments cells canonical')):
+    # One object of the stamp collection.  rle is the header and body without
+    # comments, and comments are its #N/#O/#C lines.  width and height are the
+    # maximum bounding box over the whole period, and x_offset and y_offset
+    # place the stored phase inside it.  cells are the stored phase's live
+    # cells as (x,y) pairs, decoded once so that later stages never re-parse
+    # the RLE.  canonical is the same for every phase, rotation and reflection
+    # (see canonical.py), so duplicates can be found.
+    __slots__ = ()
+
+def make_oscillator(result, stats=None, rule=DEFAULT_RULE):
+    # turns the tuple from run_pattern_in_golly or analyze_batch into an Oscillator
+    cells, comments = _timed(stats, 'rle_to_grid', convert_rle_to_grid, result[0], rule)
+    name = discoverer = ''
+    for line in comments.split('\n'):
+        if line.startswith('#N '):
+            name = line[3:].strip()
+        elif line.startswith('#O '):
+            discoverer = line[3:].strip()
+    return Oscillator(result[0][len(comments):], result[1], result[2], result[3], result[4], result[5],
+                      len(cells), name, discoverer, comments, tuple(cells), result[6])
+
+def make_glyph(rle, period, width, height):
+    # a digit or separator placed by the layout rather than read from oscillators.txt
+    cells = tuple(convert_rle_to_grid(rle)[0])
+    return Oscillator(rle, period, width, height, 0, 0, len(cells), '', '', '', cells, '')
+
+def placeholder(label, period, height):
+    # marks the end of a period or of the whole list while laying out
+    return Oscillator(label, period, 0, height, 0, 0, 0, '', '', '', (), '')
+
+class Canvas:
+    # The live cells of a pattern being assembled, e.g. the stamp collection.
+    # Only live cells are stored, so memory and output time depend on the
+    # population rather than on the area covered.  Arrays of cells (from
+    # stampcache.py) are kept as moved copies and only merged, overlaps and
+    # all, when the cells are wanted.
+    def __init__(self):
+        self.cells = set()
+        self.blocks = []
+
+    def __len__(self):
+        return len(self.pairs())
+
+    def paste(self, cells, dx=0, dy=0):
+        # cells is an iterable of (x,y) pairs or an (N, 2) array
+        if np is not None and isinstance(cells, np.ndarray):
+            self.blocks.append(cells + np.array([dx, dy], dtype=cells.dtype))
+        else:
+            self.cells.update((x+dx, y+dy) for x, y in cells)
+
+    def pairs(self):
+        # the live cells as (x,y) pairs, row by row
+        if not self.blocks:
+            return sorted(self.cells, key=lambda c:(c[1], c[0]))
+        cells = np.concatenate(self.blocks + [np.array(list(self.cells), dtype=np.int64).reshape(-1, 2)])
+        left, top = cells.min(axis=0).tolist()
+        width = int(cells[:, 0].max()) - left + 1
+        keys = np.unique((cells[:, 1] - top) * width + cells[:, 0] - left) # sorted row by row, without repeats
+        return list(zip((keys % width + left).tolist(), (keys // width + top).tolist()))
+
+    def getcells(self):
+        # cell list in Golly's format, row by row, for g.putcells
+        cells = []
+        for x, y in self.pairs():
+            cells.extend([x, y])
+        return cells
+
+    def to_rle(self, rule=DEFAULT_RULE):
+        return encode_rle(self.getcells(), rule)
+
+def analyze_entry(entry, warn=g.warn, stats=None, compact=False, rule=DEFAULT_RULE):
+    # entry is one block of oscillators.txt: comments, then the RLE, which
+    # must be in rule.  stats, if given, is filled in as by
+    # run_pattern_in_golly, plus the time taken.
+    started = time.perf_counter()
+    try:
+        parts = split_entry(entry, rule)
+        if parts is None:
+            raise ValueError
+        return run_pattern_in_golly(parts[1], parts[0], '%' in parts[1], warn, stats, compact, rule) #max period 1000 without %, 100000 with %
+    except ValueError:
+        warn('"= %s" not found: ' % rule + entry)
+    finally:
+        if stats is not None:
+            stats['seconds'] = time.perf_counter() - started
+
+def analyze_batch(entries, stats=None, compact=False, rule=DEFAULT_RULE):
+    # Runs the entries that batchlife can handle all at once.  Returns the same
+    # results as analyze_entry for those it settles and None for the rest
+    # (long periods, big patterns, non-oscillators), which should then be run
+    # with analyze_entry so that any problems get reported.  stats, if given,
+    # is a list of dicts, one per entry, filled in for the settled entries;
+    # their time isn't known separately, and the bounding box is over the
+    # whole period rather than the biggest single generation.  compact and
+    # rule are as for run_pattern_in_golly.
+    results = [None] * len(entries)
+    if batchlife.np is None:
+        return results
+    jobs = []
+    for n, entry in enumerate(entries):
+        parts = split_entry(entry, rule)
+        if parts and '%' not in parts[1]: #a % in the comments doesn't make it a long period
+            jobs.append((n,) + parts)
+    cells, offsets = rledecode.decode_rles([j[2] for j in jobs])[:2] #all the bodies at once, as (N,2) arrays
+    patterns = rledecode.split_cells(cells, offsets)
+    for (n, comments, body), pattern, found in zip(jobs, patterns, batchlife.find_periods(patterns, compact=compact, rule=rule)):
+        if found:
+            period, box, peak, phases, best = found
+            min_min_x, min_min_y = min(0, box[0]), min(0, box[1]) #the box always includes (0,0), as in run_pattern_in_golly
+            if stats is not None:
+                stats[n].update(source='batch', extended=False, gens=period, seconds=None, peak_population=peak,
+                                peak_width=box[2]-box[0]+1, peak_height=box[3]-box[1]+1)
+            x_offset, y_offset = -min_min_x, -min_min_y
+            if best: #a more compact phase, as (x,y) pairs
+                pattern = [coordinate for cell in best for coordinate in cell]
+                x_offset, y_offset = min(best)[0]-min_min_x, min(c[1] for c in best)-min_min_y
+            else:
+                pattern = pattern.ravel().tolist()
+            results[n] = (comments + _timed(stats[n] if stats is not None else None, 'grid_to_rle', convert_grid_to_rle, pattern, rule), period, box[2]-min_min_x+1, box[3]-min_min_y+1, x_offset, y_offset,
+                          canonical_hash(phases))
+    return results
+
+def _analyze_job(entry, profile=False, compact=False, rule=DEFAULT_RULE):
+    # runs in a worker process, where there's nobody to click OK on a popup,
+    # so warnings are sent back along with the result
+    messages = []
+    stats = {} if profile else None
+    return analyze_entry(entry, messages.append, stats, compact, rule), messages, stats
+
+def analyze_entries(entries, workers, progress=None, profile=False, compact=False, rule=DEFAULT_RULE):
+    # runs analyze_entry on every entry using a pool of worker processes.
+    # Returns a list of (result, warnings, stats) in the same order as entries;
+    # stats is None unless profile is set.
+    # progress(count) is called in the main process as results come in.
+    job = partial(_analyze_job, profile=profile, compact=compact, rule=rule)
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork') # other start methods would re-run b3s23osc.py in every worker
+    else:
+        context = None
+        workers = 1
+    if workers <= 1:
+        jobs = map(job, entries)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(workers, mp_context=context)
+        jobs = pool.map(job, entries, chunksize=4)
+    results = []
+    try:
+        for job in jobs:
+            results.append(job)
+            if progress:
+                progress(len(results))
+    finally:
+        if pool:
+            pool.shutdown()
+    return results
@@ -0,0 +1,37 @@
+# oscprofile.py
+# The per-pattern report written when b3s23osc.py is run with PROFILE_FILE
+# set: one row per entry of oscillators.txt saying how it was analyzed (cache,
+# batch, step or hashlife), how many generations that took, the wall time,
+# the peak population and bounding box, and the time spent converting
+# between RLE and cell lists.  Times are in seconds; a blank means the value
+# wasn't measured (e.g. entries taken from the cache).
+
+import csv
+import json
+
+FIELDS = ['entry', 'name', 'source', 'ok', 'extended', 'gens', 'seconds', 'peak_population',
+          'peak_width', 'peak_height', 'rle_to_grid', 'grid_to_rle']
+
+def write_report(path, rows):
+    # rows are dicts with the keys in FIELDS; a path ending in .json gets JSON, anything else CSV
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump([dict((k, r.get(k)) for k in FIELDS) for r in rows], f, indent=1)
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def summary(rows, top=10):
+    # a few lines about where the time went, with the slowest entries
+    timed = [r for r in rows if r.get('seconds') is not None]
+    lines = ['%s entries: ' % len(rows) + ', '.join('%s %s' % (sum(1 for r in rows if r.get('source') == s), s)
+                                                   for s in ('cache', 'batch', 'step', 'hashlife'))]
+    lines.append('%.1f seconds in entries run one at a time, %.1f converting RLE' %
+                 (sum(r['seconds'] for r in timed), sum((r.get('rle_to_grid') or 0) + (r.get('grid_to_rle') or 0) for r in rows)))
+    lines.append('Slowest:')
+    for r in sorted(timed, key=lambda r:-r['seconds'])[:top]:
+        lines.append('  #%s %s: %.2f s, %s gens (%s), peak %s cells in %sx%s' % (r['entry'], r.get('name') or '(no name)',
+                     r['seconds'], r.get('gens'), r.get('source'), r.get('peak_population') or '?', r.get('peak_width'), r.get('peak_height')))
+    return '\n'.join(lines)
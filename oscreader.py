@@ -0,0 +1,117 @@
+# oscreader.py
+# Reads oscillators.txt one entry at a time.  Entries are separated by blank
+# lines; each has optional #N (name), #O (discoverer and date) and #C lines,
+# an "x = ..." header, and an RLE body that may end in %N for periods too long
+# to find by simulation.
+#
+# The file is read line by line in a single pass, so it never has to be in
+# memory all at once, and every record knows its byte offset and length.  An
+# index of those offsets can be saved, so that a single oscillator can be
+# looked up by name or period without reading the rest of the file.
+
+import json
+import os
+from collections import namedtuple
+
+INDEX_VERSION = 1
+
+class Record(namedtuple('Record', 'name discoverer comments header rle extended text offset size')):
+    # name and discoverer are None if the entry has no #N or #O line; comments
+    # holds the #C lines; rle is the body without line breaks or the %N suffix,
+    # and extended is N (or None).  text is the entry as it appears in the file,
+    # which is what osclib and osccache work with.
+    __slots__ = ()
+
+def _make_record(lines, offset, size):
+    name = discoverer = header = None
+    comments = []
+    body = []
+    for line in lines:
+        if header is not None:
+            body.append(line.strip())
+        elif line.startswith('#N'):
+            name = line[2:].strip()
+        elif line.startswith('#O'):
+            discoverer = line[2:].strip()
+        elif line.startswith('#C'):
+            comments.append(line[2:].strip())
+        elif line.startswith('x ') or line.startswith('x='):
+            header = line.strip()
+    rle = ''.join(body)
+    extended = None
+    if '%' in rle:
+        rle, suffix = rle.split('%', 1)
+        if suffix.isdigit():
+            extended = int(suffix)
+    return Record(name, discoverer, tuple(comments), header, rle, extended, '\n'.join(lines), offset, size)
+
+def read_records(file, start=0, stop=None):
+    # Yields a Record for each entry, starting at byte offset start and ending
+    # at the first entry that starts at or after stop.  The lowercase
+    # "b3/s23" used by a couple of entries is read as "B3/S23".
+    with open(file, 'rb') as f:
+        f.seek(start)
+        offset = start
+        lines = []
+        first = end = offset
+        for raw in f:
+            if stop is not None and not lines and offset >= stop:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            offset += len(raw)
+            if not line.strip():
+                if lines:
+                    yield _make_record(lines, first, end - first)
+                    lines = []
+                continue
+            if not lines:
+                first = offset - len(raw)
+            lines.append(line.replace('b3/s23', 'B3/S23'))
+            end = offset
+        if lines:
+            yield _make_record(lines, first, end - first)
+
+def read_record(file, offset, size):
+    # the single record at a known offset, as listed in an index
+    return next(read_records(file, offset, offset + size))
+
+def _stamp(file):
+    info = os.stat(file)
+    return [info.st_size, int(info.st_mtime)]
+
+def write_index(path, file, records, periods=None):
+    # Saves the offset of each record.  periods, if given, is the true period of
+    # each record (from pass 2) or None; otherwise only %N periods are known.
+    if periods is None:
+        periods = [r.extended for r in records]
+    index = {'version': INDEX_VERSION, 'source': os.path.basename(file), 'stamp': _stamp(file),
+             'records': [[r.offset, r.size, p, r.name] for r, p in zip(records, periods)]}
+    tempname = path + '.tmp'
+    with open(tempname, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tempname, path)
+
+def load_index(path, file):
+    # returns the list of [offset, size, period, name], or None if the index is
+    # missing or file has changed since it was written
+    try:
+        with open(path) as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION and index.get('stamp') == _stamp(file):
+            return index['records']
+    except (OSError, ValueError):
+        pass
+    return None
+
+def find(path, file, name=None, period=None):
+    # Yields the records with the given name (ignoring case) and/or period,
+    # reading only those records from file.
+    records = load_index(path, file)
+    if records is None:
+        raise ValueError('No up-to-date index of %s in %s' % (file, path))
+    for offset, size, p, n in records:
+        if period is not None and p != period:
+            continue
+        if name is not None and (n or '').lower() != name.lower():
+            continue
+        yield read_record(file, offset, size)
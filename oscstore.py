@@ -0,0 +1,138 @@
+# oscstore.py
+# A compact binary copy of the stamp collection's oscillators, for tools that
+# want the cells without parsing oscillators.txt or oscillators.rle.
+#
+# Layout (little-endian):
+#   header   8-byte magic, version (uint32), number of oscillators (uint32)
+#   table    one RECORD per oscillator, in stamp-collection order
+#   names    UTF-8 names and labels, found by name_offset and name_size and
+#            by label_offset and label_size
+#   bitmaps  each oscillator's stored phase, cell_height rows of row_bytes
+#            bytes, packed most significant bit first (as np.packbits does)
+#
+# label is the oscillator's period.row.number, as in the #N lines of
+# oscillators.rle.  width, height, x_offset and y_offset are as in
+# osclib.Oscillator (the bounding box over the whole period); cell_width and
+# cell_height are the size of the stored phase.  Writing needs only the standard library;
+# reading maps the file with mmap and needs NumPy.
+
+import mmap
+import os
+import struct
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'OSCSTORE'
+VERSION = 2
+HEADER = struct.Struct('<8sII')
+FIELDS = [('period', '<u4'), ('width', '<u4'), ('height', '<u4'), ('x_offset', '<i4'), ('y_offset', '<i4'),
+          ('population', '<u4'), ('cell_width', '<u4'), ('cell_height', '<u4'), ('row_bytes', '<u4'),
+          ('bitmap_offset', '<u8'), ('name_offset', '<u4'), ('name_size', '<u4'),
+          ('label_offset', '<u4'), ('label_size', '<u4')]
+RECORD = struct.Struct('<IIIiiIIIIQIIII') # the same fields, for writing without NumPy
+
+def _bitmap(cells):
+    # (cell_width, cell_height, row_bytes, packed rows) for cells starting at (0,0)
+    if not cells:
+        return 0, 0, 0, b''
+    width = max(c[0] for c in cells) + 1
+    height = max(c[1] for c in cells) + 1
+    row_bytes = (width + 7) // 8
+    bits = bytearray(row_bytes * height)
+    for x, y in cells:
+        bits[y*row_bytes + x//8] |= 0x80 >> (x % 8)
+    return width, height, row_bytes, bytes(bits)
+
+def write_store(path, placements):
+    # placements is a list of (label, osclib.Oscillator, x, y) in
+    # stamp-collection order, as for osccatalog.write_catalog
+    names = bytearray()
+    bitmaps = []
+    table = []
+    start = HEADER.size + RECORD.size * len(placements)
+    name_blob = [(osc.name.encode('utf-8'), label.encode('utf-8')) for label, osc, x, y in placements]
+    bitmap_offset = start + sum(len(n) + len(l) for n, l in name_blob)
+    for (label, osc, x, y), (name, label) in zip(placements, name_blob):
+        cell_width, cell_height, row_bytes, bits = _bitmap(osc.cells)
+        table.append(RECORD.pack(osc.period, osc.width, osc.height, osc.x_offset, osc.y_offset, osc.population,
+                                 cell_width, cell_height, row_bytes, bitmap_offset, len(names), len(name),
+                                 len(names) + len(name), len(label)))
+        names += name + label
+        bitmaps.append(bits)
+        bitmap_offset += len(bits)
+    tempname = path + '.tmp'
+    with open(tempname, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(placements)))
+        f.write(b''.join(table))
+        f.write(names)
+        f.write(b''.join(bitmaps))
+    os.replace(tempname, path)
+
+class PatternStore:
+    # Read-only access to a file written by write_store.  table is a NumPy
+    # structured array (fields as in FIELDS) backed directly by the mapped
+    # file, so opening a store costs the same whatever its size.
+    def __init__(self, path):
+        if np is None:
+            raise ImportError('PatternStore needs NumPy')
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('%s is not a version %s oscillator store' % (path, VERSION))
+        self.table = np.frombuffer(self._map, dtype=np.dtype(FIELDS), count=count, offset=HEADER.size)
+        self._names = HEADER.size + RECORD.size * count
+
+    def __len__(self):
+        return len(self.table)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # views returned by bitmap() must be dropped first
+        self.table = None
+        self._map.close()
+
+    def name(self, n):
+        r = self.table[n]
+        start = self._names + int(r['name_offset'])
+        return self._map[start:start + int(r['name_size'])].decode('utf-8')
+
+    def label(self, n):
+        # period.row.number, as in oscillators.rle
+        r = self.table[n]
+        start = self._names + int(r['label_offset'])
+        return self._map[start:start + int(r['label_size'])].decode('utf-8')
+
+    def bitmap(self, n):
+        # the stored phase as a (cell_height, row_bytes) uint8 view into the file
+        r = self.table[n]
+        return np.frombuffer(self._map, dtype=np.uint8, count=int(r['cell_height']) * int(r['row_bytes']),
+                             offset=int(r['bitmap_offset'])).reshape(int(r['cell_height']), int(r['row_bytes']))
+
+    def grid(self, n):
+        # the stored phase as a (cell_height, cell_width) array of 0s and 1s
+        return np.unpackbits(self.bitmap(n), axis=1, count=int(self.table[n]['cell_width']))
+
+    def cells(self, n):
+        # live cells as an (N, 2) int32 array of (x, y), row by row like Golly's cell lists
+        ys, xs = np.nonzero(self.grid(n))
+        return np.stack([xs, ys], axis=1).astype(np.int32)
+
+    def find(self, period=None, max_width=None, max_height=None):
+        # indices of the oscillators with the given period and/or at most the given size
+        keep = np.ones(len(self.table), dtype=bool)
+        if period is not None:
+            keep &= self.table['period'] == period
+        if max_width is not None:
+            keep &= self.table['width'] <= max_width
+        if max_height is not None:
+            keep &= self.table['height'] <= max_height
+        return np.flatnonzero(keep)
@@ -0,0 +1,29 @@
+# oscwriter.py
+# Writes the finished stamp collection: the comment block, a blank line, the
+# RLE of every live cell, and the LifeViewer label commands.  Each part is
+# written to the file as it's produced, so there's never a second copy of the
+# whole pattern in memory and no need to save it from Golly and read it back.
+# A filename ending in .gz (or compress=True) writes a gzip file.
+
+import gzip
+from rletools import write_rle
+
+def open_output(filename, compress=None):
+    if compress or (compress is None and filename.endswith('.gz')):
+        return gzip.open(filename, 'wt', newline='\n')
+    return open(filename, 'w')
+
+def write_collection(f, comment_lines, pairs, label_lines=(), rule='B3/S23'):
+    # f is an open text file (or anything with write); comment_lines and
+    # label_lines are iterables of lines ending in newlines, and pairs are the
+    # live cells sorted row by row
+    for line in comment_lines:
+        f.write(line)
+    f.write('\n')
+    write_rle(f, pairs, rule)
+    for line in label_lines:
+        f.write(line)
+
+def save_collection(filename, comment_lines, pairs, label_lines=(), rule='B3/S23', compress=None):
+    with open_output(filename, compress) as f:
+        write_collection(f, comment_lines, pairs, label_lines, rule)
@@ -0,0 +1,119 @@
+# rledecode.py
+# Decodes many RLE bodies at once with NumPy.  All the bodies are joined into
+# one byte array and tokenized, counted and expanded into cells with array
+# operations, so the cost per pattern is a few slices rather than a Python
+# loop over every character and cell.
+#
+# The result is a single (N, 2) int32 array of (x, y) for the cells of every
+# pattern, one after another, plus offsets: pattern n is
+# cells[offsets[n]:offsets[n+1]].  Cells come out in the same order as
+# g.parse gives them.  Bodies may span several lines and may end in %N (the
+# period of entries too long to simulate), which is returned separately.
+#
+# Running this module checks the decoder against rletools.encode_rle on
+# random patterns: python rledecode.py [count] [seed]
+
+import random
+import sys
+from rletools import encode_rle
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_ROW = ord('$')
+_END = ord('!')
+
+def split_body(body):
+    # (RLE up to and including "!", N from a %N suffix or 0)
+    end = body.find('!')
+    if end < 0:
+        return body + '!', 0
+    rest = body[end+1:].strip()
+    extended = int(rest[1:]) if rest.startswith('%') and rest[1:].isdigit() else 0
+    return body[:end+1], extended
+
+def decode_rles(bodies):
+    # Returns (cells, offsets, extended) for a list of RLE bodies (no
+    # "x = " header).  extended[n] is the N of a trailing %N, or 0.
+    parts = [split_body(b) for b in bodies]
+    extended = np.array([p[1] for p in parts], dtype=np.int64)
+    text = ''.join(p[0] for p in parts).encode('ascii', 'replace')
+    chars = np.frombuffer(text, dtype=np.uint8)
+    chars = chars[(chars > 32)] # whitespace and line breaks
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    tokens = np.flatnonzero(~is_digit) # position of every item's letter
+    kinds = chars[tokens]
+    # the repeat count of each item is the number formed by the digits just before it
+    digits = np.flatnonzero(is_digit)
+    owner = np.searchsorted(tokens, digits) # which item each digit belongs to
+    power = tokens[owner] - digits - 1
+    values = (chars[digits] - ord('0')).astype(np.int64) * 10 ** power.astype(np.int64)
+    counts = np.bincount(owner, weights=values, minlength=len(tokens)).astype(np.int64)
+    has_digits = np.zeros(len(tokens), dtype=bool)
+    has_digits[owner] = True
+    counts[~has_digits] = 1
+    is_end = kinds == _END
+    is_row = kinds == _ROW
+    is_dead = (kinds == ord('b')) | (kinds == ord('.'))
+    is_live = ~is_end & ~is_row & ~is_dead & (((kinds | 32) >= ord('a')) & ((kinds | 32) <= ord('z')))
+    # pattern number of each item (an item belongs to the pattern its "!" ends)
+    pattern = np.cumsum(is_end) - is_end
+    # y: rows moved down since the start of the pattern
+    down = np.cumsum(np.where(is_row, counts, 0))
+    ends = np.flatnonzero(is_end)
+    start_down = np.concatenate(([0], down[ends]))[pattern]
+    y = down - np.where(is_row, counts, 0) - start_down
+    # x: cells moved right since the start of the row (or pattern)
+    step = np.where(is_live | is_dead, counts, 0)
+    right = np.cumsum(step) - step # before this item
+    after_reset = np.zeros(len(tokens), dtype=bool) # first item of a row
+    after_reset[1:] = is_row[:-1] | is_end[:-1]
+    row_first = np.maximum.accumulate(np.where(after_reset, np.arange(len(tokens)), 0))
+    x = right - right[row_first]
+    # expand each run of live cells
+    runs = np.flatnonzero(is_live)
+    lengths = counts[runs]
+    total = int(lengths.sum())
+    first = np.cumsum(lengths) - lengths
+    within = np.arange(total) - np.repeat(first, lengths)
+    cells = np.empty((total, 2), dtype=np.int32)
+    cells[:, 0] = np.repeat(x[runs], lengths) + within
+    cells[:, 1] = np.repeat(y[runs], lengths)
+    per_pattern = np.bincount(pattern[runs], weights=lengths, minlength=len(bodies)).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(per_pattern)))
+    return cells, offsets, extended
+
+def split_cells(cells, offsets):
+    # a view of each pattern's (N, 2) cells
+    return [cells[offsets[n]:offsets[n+1]] for n in range(len(offsets) - 1)]
+
+def roundtrip_check(count=1000, seed=0):
+    # decodes what encode_rle makes of random patterns (and a few awkward
+    # bodies) and checks the cells are the same; returns the number checked
+    rng = random.Random(seed)
+    cases = []
+    for n in range(count):
+        w, h = rng.randint(1, 80), rng.randint(1, 40)
+        density = rng.random()
+        cells = [c for y in range(h) for x in range(w) if rng.random() < density for c in (x, y)]
+        body = encode_rle(cells).split('\n', 1)[1]
+        if rng.random() < 0.2:
+            body += '%' + str(rng.randint(1, 99999))
+        left, top = min(cells[::2] or [0]), min(cells[1::2] or [0]) # encode_rle moves the pattern to (0,0)
+        cases.append((body, sorted(((x - left, y - top) for x, y in zip(cells[::2], cells[1::2])), key=lambda c:(c[1], c[0]))))
+    cases.append(('2o$\n2o!', [(0, 0), (1, 0), (0, 1), (1, 1)]))
+    cases.append(('bo3$3o!%1380', [(1, 0), (0, 3), (1, 3), (2, 3)]))
+    cases.append(('o..A$b2o\n\n!', [(0, 0), (3, 0), (1, 1), (2, 1)]))
+    cells, offsets, extended = decode_rles([c[0] for c in cases])
+    for n, (body, expected) in enumerate(cases):
+        got = [tuple(c) for c in cells[offsets[n]:offsets[n+1]].tolist()]
+        if sorted(got, key=lambda c:(c[1], c[0])) != expected:
+            raise AssertionError('pattern %s decoded wrongly: %r' % (n, body))
+        if extended[n] != split_body(body)[1]:
+            raise AssertionError('pattern %s has the wrong %%N: %r' % (n, body))
+    return len(cases)
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    print('%s patterns decoded correctly' % roundtrip_check(*args))
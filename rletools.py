@@ -0,0 +1,126 @@
+# rletools.py
+# Run-length encoding of cell lists.  encode_rle makes a single pass over the
+# live cells (sorted row by row), so its cost is proportional to the population
+# rather than to the bounding box, and it wraps lines the way Golly does.
+#
+#   python rletools.py [oscillators.txt]
+#
+# checks encode_rle against every entry of oscillators.txt.
+
+import re
+import sys
+
+def sorted_cells(cells):
+    # turns a Golly cell list [x0,y0,x1,y1,...] into (x,y) pairs, row by row.
+    # Cell lists from g.parse and g.evolve are already in this order, which
+    # Python's sort notices in linear time.
+    return sorted(set(zip(cells[::2], cells[1::2])), key=lambda c:(c[1], c[0]))
+
+def rle_tokens(pairs, left):
+    # yields the RLE items ("3o", "2b", "4$", ...) for sorted pairs, ending with "!".
+    # left is the x coordinate of the bounding box's left edge.
+    row = None
+    x = left
+    run = 0 # length of the run of live cells ending at x-1
+    for cx, cy in pairs:
+        if cy != row or cx != x: # the current run ends here
+            if run:
+                yield '%do' % run if run > 1 else 'o'
+                run = 0
+            if cy != row:
+                if row is not None:
+                    yield '%d$' % (cy - row) if cy - row > 1 else '$'
+                row = cy
+                x = left
+            if cx != x:
+                yield '%db' % (cx - x) if cx - x > 1 else 'b'
+        run += 1
+        x = cx + 1
+    if run:
+        yield '%do' % run if run > 1 else 'o'
+    yield '!'
+
+def rle_lines(tokens, width=70):
+    # joins RLE items into lines of at most width characters without splitting an item
+    line = ''
+    for t in tokens:
+        if len(line) + len(t) > width:
+            yield line
+            line = ''
+        line += t
+    yield line
+
+def bounding_box(pairs):
+    # (left, top, width, height) of sorted pairs
+    left = min(c[0] for c in pairs)
+    return left, pairs[0][1], max(c[0] for c in pairs) - left + 1, pairs[-1][1] - pairs[0][1] + 1
+
+def encode_rle(cells, rule='B3/S23', width=70):
+    # returns "x = W, y = H, rule = ..." followed by the RLE of a cell list.
+    # The pattern is moved so that its bounding box starts at (0,0).
+    pairs = sorted_cells(cells)
+    if not pairs:
+        return 'x = 0, y = 0, rule = %s\n!' % rule
+    left, top, w, h = bounding_box(pairs)
+    return 'x = %s, y = %s, rule = %s\n' % (w, h, rule) + '\n'.join(rle_lines(rle_tokens(pairs, left), width))
+
+def write_rle(f, pairs, rule='B3/S23', width=70):
+    # Writes sorted pairs to an open text file the way Golly saves a pattern:
+    # a #CXRLE line giving the position if the pattern doesn't start at (0,0),
+    # the header, then the wrapped RLE.  Nothing is built up in memory first.
+    if not pairs:
+        f.write('x = 0, y = 0, rule = %s\n!\n' % rule)
+        return
+    left, top, w, h = bounding_box(pairs)
+    if left or top:
+        f.write('#CXRLE Pos=%d,%d\n' % (left, top))
+    f.write('x = %d, y = %d, rule = %s\n' % (w, h, rule))
+    for line in rle_lines(rle_tokens(pairs, left), width):
+        f.write(line + '\n')
+
+_HEADER = re.compile(r'x = (\d+), y = (\d+), rule = (\S+)$')
+_LINE = re.compile(r'(?:\d*[bo$])*!?$') # whole items only
+
+def _bodies(path):
+    # the RLE body of each entry of oscillators.txt, without any %N
+    with open(path) as f:
+        for entry in f.read().split('\n\n'):
+            start = entry.find('x =')
+            if start >= 0:
+                yield entry[entry.find('\n', start) + 1:].split('%')[0]
+
+def roundtrip_check(path='oscillators.txt', width=70):
+    # Encodes the cells of every entry of path and parses the result again,
+    # checking that the cells are the same (moved to (0,0)), that the header
+    # gives the bounding box and rule, and that the body is wrapped at width
+    # without splitting an item.  Returns the number of entries checked.
+    try:
+        import golly as g
+    except ImportError: # not running inside Golly
+        import lifeengine as g
+    count = 0
+    for body in _bodies(path):
+        count += 1
+        cells = g.parse(body)
+        expected = sorted_cells(cells)
+        if expected:
+            left, top = min(c[0] for c in expected), expected[0][1]
+            expected = [(x - left, y - top) for x, y in expected]
+        rle = encode_rle(cells, 'B3/S23', width)
+        header, body = rle.split('\n', 1)
+        found = _HEADER.match(header)
+        size = bounding_box(expected)[2:] if expected else (0, 0)
+        if not found or (int(found.group(1)), int(found.group(2))) != size or found.group(3) != 'B3/S23':
+            raise AssertionError('entry %s has the wrong header: %r' % (count, header))
+        lines = body.split('\n')
+        for n, line in enumerate(lines):
+            if len(line) > width or not _LINE.match(line) or line.endswith('!') != (n == len(lines) - 1):
+                raise AssertionError('entry %s is wrapped wrongly: %r' % (count, line))
+            if n < len(lines) - 1 and len(line) + len(re.match(r'\d*.', lines[n+1]).group()) <= width:
+                raise AssertionError('entry %s has a line broken early: %r' % (count, line))
+        if sorted_cells(g.parse(body)) != expected:
+            raise AssertionError('entry %s encoded wrongly: %r' % (count, body))
+    return count
+
+if __name__ == '__main__':
+    print('%s entries encoded correctly' % roundtrip_check(*sys.argv[1:2]))
@@ -0,0 +1,40 @@
+# stampcache.py
+# The decoded form of each pattern that pass 3 puts down, keyed by its RLE:
+# its live cells, as an (N, 2) NumPy array if NumPy is installed (a tuple of
+# (x,y) pairs otherwise), and the right and bottom edges of its bounding box,
+# which always starts at (0,0).  The period digits and separator blocks are
+# put down hundreds of times each and every label needs its object's box, so
+# both are worked out once here and pasting becomes copying an array.
+#
+# At most MAX_STAMPS patterns are kept, dropping the least recently used;
+# that's more than the collection has, so a build decodes each one once.
+
+from collections import OrderedDict, namedtuple
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAX_STAMPS = 4096
+
+Stamp = namedtuple('Stamp', 'cells right bottom')
+
+_stamps = OrderedDict()
+
+def stamp(osc):
+    # the Stamp of an osclib.Oscillator (or glyph)
+    found = _stamps.get(osc.rle)
+    if found is not None:
+        _stamps.move_to_end(osc.rle)
+        return found
+    if np is not None:
+        cells = np.array(osc.cells, dtype=np.int64).reshape(-1, 2)
+        right, bottom = cells.max(axis=0).tolist() if len(cells) else (0, 0)
+    else:
+        cells = osc.cells
+        right = max((c[0] for c in cells), default=0)
+        bottom = max((c[1] for c in cells), default=0)
+    found = _stamps[osc.rle] = Stamp(cells, right, bottom)
+    if len(_stamps) > MAX_STAMPS:
+        _stamps.popitem(last=False)
+    return found